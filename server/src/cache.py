@@ -0,0 +1,48 @@
+"""In-process caches for graph data."""
+
+from collections import OrderedDict
+from typing import Optional
+
+from src.models import KnowledgeGraph, Topic
+
+# Graphs whose topic snapshots are kept before the least recently used is dropped
+DEFAULT_MAX_GRAPHS = 64
+
+
+class GraphSnapshotCache:
+    """Latest topic listing per graph, tagged with the graph's etag version.
+
+    A snapshot is only served while the graph's etag_version still matches,
+    so any write to the graph (from any process) makes it stale. Stale
+    snapshots are dropped when they are looked up, and at most ``max_graphs``
+    snapshots are kept, evicting the least recently used one.
+    """
+
+    def __init__(self, max_graphs: int = DEFAULT_MAX_GRAPHS) -> None:
+        self.max_graphs = max_graphs
+        self._snapshots: OrderedDict[str, tuple[int, dict[str, Topic]]] = OrderedDict()
+
+    def get_topics(self, graph: KnowledgeGraph) -> Optional[dict[str, Topic]]:
+        """Get topics by slug if the snapshot is current, else None."""
+        snapshot = self._snapshots.get(graph.id)
+        if snapshot is None:
+            return None
+        if snapshot[0] != graph.etag_version:
+            del self._snapshots[graph.id]
+            return None
+        self._snapshots.move_to_end(graph.id)
+        return snapshot[1]
+
+    def store_topics(self, graph: KnowledgeGraph, topics: list[Topic]) -> None:
+        """Store the topics read for the graph's current version."""
+        self._snapshots[graph.id] = (
+            graph.etag_version,
+            {topic.url_slug: topic for topic in topics},
+        )
+        self._snapshots.move_to_end(graph.id)
+        while len(self._snapshots) > self.max_graphs:
+            self._snapshots.popitem(last=False)
+
+    def invalidate(self, graph_id: str) -> None:
+        """Drop the snapshot for a graph."""
+        self._snapshots.pop(graph_id, None)
@@ -1,18 +1,23 @@
 """SQLite database adapter implementation."""
 
+import asyncio
+import functools
 import json
 import os
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, Optional, TypeVar
 
 import aiosqlite
 
-from src.db.types import DatabaseAdapter
+from src.db.types import DatabaseAdapter, DuplicateEntryError
 from src.models import (
+    BatchCoursesOperations,
+    BatchEdgesOperations,
     BatchOperations,
     BatchResult,
+    BatchTopicsOperations,
     Course,
     CourseCreate,
     CourseUpdate,
@@ -36,6 +41,27 @@ def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+_T = TypeVar("_T")
+
+
+def _serialized_write(
+    method: Callable[..., Awaitable[_T]],
+) -> Callable[..., Awaitable[_T]]:
+    """Run a write method under the adapter's write lock.
+
+    All requests share one connection, so a write that awaits between its
+    first statement and its commit must not let another write start, or the
+    two end up in (and commit or roll back) the same transaction.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self: "SQLiteAdapter", *args, **kwargs) -> _T:
+        async with self._write_lock:
+            return await method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class SQLiteAdapter(DatabaseAdapter):
     """SQLite database adapter using aiosqlite."""
 
@@ -43,6 +69,7 @@ class SQLiteAdapter(DatabaseAdapter):
         self.db_path = db_path
         self.scraper_db_path = scraper_db_path
         self.db: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
 
     async def initialize(self) -> None:
         """Initialize the database connection and schema."""
@@ -57,6 +84,7 @@ class SQLiteAdapter(DatabaseAdapter):
 
         # Create schema
         await self._create_schema()
+        await self._migrate_schema()
 
         # Initialize default graph from scraper DB if needed
         await self._init_default_graph()
@@ -74,6 +102,7 @@ class SQLiteAdapter(DatabaseAdapter):
                 is_default INTEGER DEFAULT 0,
                 is_readonly INTEGER DEFAULT 0,
                 source_graph_id TEXT,
+                etag_version INTEGER NOT NULL DEFAULT 0,
                 created_at TEXT NOT NULL,
                 updated_at TEXT NOT NULL,
                 FOREIGN KEY (source_graph_id) REFERENCES knowledge_graphs(id)
@@ -132,6 +161,15 @@ class SQLiteAdapter(DatabaseAdapter):
         """
         )
 
+    async def _migrate_schema(self) -> None:
+        """Add columns introduced after a database file was first created."""
+        cursor = await self.db.execute("PRAGMA table_info(knowledge_graphs)")
+        columns = {row["name"] for row in await cursor.fetchall()}
+        if "etag_version" not in columns:
+            await self.db.execute(
+                "ALTER TABLE knowledge_graphs ADD COLUMN etag_version INTEGER NOT NULL DEFAULT 0"
+            )
+
     async def _init_default_graph(self) -> None:
         """Initialize default graph from scraper database if it exists."""
         # Check if default graph already exists
@@ -270,6 +308,7 @@ class SQLiteAdapter(DatabaseAdapter):
             isDefault=bool(row["is_default"]),
             isReadonly=bool(row["is_readonly"]),
             sourceGraphId=row["source_graph_id"],
+            etagVersion=row["etag_version"],
             createdAt=row["created_at"],
             updatedAt=row["updated_at"],
         )
@@ -313,14 +352,33 @@ class SQLiteAdapter(DatabaseAdapter):
             createdAt=row["created_at"],
         )
 
+    async def _bump_etag_version(self, graph_id: str) -> None:
+        """Mark a graph's contents as changed so cached responses go stale."""
+        await self.db.execute(
+            "UPDATE knowledge_graphs SET etag_version = etag_version + 1 WHERE id = ?",
+            (graph_id,),
+        )
+
     # =========================================================================
     # Graph Operations
     # =========================================================================
 
-    async def list_graphs(self) -> list[KnowledgeGraph]:
-        """List all knowledge graphs."""
+    async def list_graphs(
+        self, is_default: Optional[bool] = None, is_readonly: Optional[bool] = None
+    ) -> list[KnowledgeGraph]:
+        """List knowledge graphs, optionally filtered by default/readonly flags."""
+        conditions = []
+        params = []
+        if is_default is not None:
+            conditions.append("is_default = ?")
+            params.append(int(is_default))
+        if is_readonly is not None:
+            conditions.append("is_readonly = ?")
+            params.append(int(is_readonly))
+
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
         cursor = await self.db.execute(
-            "SELECT * FROM knowledge_graphs ORDER BY created_at DESC"
+            f"SELECT * FROM knowledge_graphs {where}ORDER BY created_at DESC", params
         )
         rows = await cursor.fetchall()
         return [self._row_to_graph(row) for row in rows]
@@ -333,6 +391,7 @@ class SQLiteAdapter(DatabaseAdapter):
         row = await cursor.fetchone()
         return self._row_to_graph(row) if row else None
 
+    @_serialized_write
     async def create_graph(self, data: KnowledgeGraphCreate) -> KnowledgeGraph:
         """Create a new knowledge graph."""
         now = _now_iso()
@@ -394,6 +453,7 @@ class SQLiteAdapter(DatabaseAdapter):
             (target_id, now, source_id),
         )
 
+    @_serialized_write
     async def update_graph(
         self, graph_id: str, data: KnowledgeGraphUpdate
     ) -> KnowledgeGraph:
@@ -416,13 +476,14 @@ class SQLiteAdapter(DatabaseAdapter):
             params.append(graph_id)
 
             await self.db.execute(
-                f"UPDATE knowledge_graphs SET {', '.join(updates)} WHERE id = ?",
+                f"UPDATE knowledge_graphs SET {', '.join(updates)}, etag_version = etag_version + 1 WHERE id = ?",
                 params,
             )
             await self.db.commit()
 
         return await self.get_graph(graph_id)
 
+    @_serialized_write
     async def delete_graph(self, graph_id: str) -> None:
         """Delete a knowledge graph."""
         await self.db.execute("DELETE FROM knowledge_graphs WHERE id = ?", (graph_id,))
@@ -441,6 +502,14 @@ class SQLiteAdapter(DatabaseAdapter):
         rows = await cursor.fetchall()
         return [self._row_to_course(row) for row in rows]
 
+    async def count_courses(self, graph_id: str) -> int:
+        """Count the courses in a graph."""
+        cursor = await self.db.execute(
+            "SELECT COUNT(*) FROM kg_courses WHERE graph_id = ?", (graph_id,)
+        )
+        row = await cursor.fetchone()
+        return row[0]
+
     async def get_course(self, graph_id: str, course_id: int) -> Optional[Course]:
         """Get a course by ID."""
         cursor = await self.db.execute(
@@ -450,6 +519,7 @@ class SQLiteAdapter(DatabaseAdapter):
         row = await cursor.fetchone()
         return self._row_to_course(row) if row else None
 
+    @_serialized_write
     async def create_course(self, graph_id: str, data: CourseCreate) -> Course:
         """Create a new course."""
         now = _now_iso()
@@ -469,10 +539,12 @@ class SQLiteAdapter(DatabaseAdapter):
             """,
             (graph_id, course_id, data.name.strip(), data.color, now, now),
         )
+        await self._bump_etag_version(graph_id)
         await self.db.commit()
 
         return await self.get_course(graph_id, course_id)
 
+    @_serialized_write
     async def update_course(
         self, graph_id: str, course_id: int, data: CourseUpdate
     ) -> Course:
@@ -499,16 +571,19 @@ class SQLiteAdapter(DatabaseAdapter):
                 f"UPDATE kg_courses SET {', '.join(updates)} WHERE graph_id = ? AND course_id = ?",
                 params,
             )
+            await self._bump_etag_version(graph_id)
             await self.db.commit()
 
         return await self.get_course(graph_id, course_id)
 
+    @_serialized_write
     async def delete_course(self, graph_id: str, course_id: int) -> None:
         """Delete a course."""
         await self.db.execute(
             "DELETE FROM kg_courses WHERE graph_id = ? AND course_id = ?",
             (graph_id, course_id),
         )
+        await self._bump_etag_version(graph_id)
         await self.db.commit()
 
     # =========================================================================
@@ -533,15 +608,18 @@ class SQLiteAdapter(DatabaseAdapter):
         row = await cursor.fetchone()
         return self._row_to_topic(row) if row else None
 
+    @_serialized_write
     async def create_topic(self, graph_id: str, data: TopicCreate) -> Topic:
         """Create a new topic."""
         now = _now_iso()
         has_content = 1 if data.content_html or data.content_text else 0
 
-        await self.db.execute(
+        cursor = await self.db.execute(
             """
             INSERT INTO kg_topics (graph_id, url_slug, display_name, course_id, parent_slugs, content_html, content_text, has_content, created_at, updated_at)
             VALUES (?, ?, ?, ?, '[]', ?, ?, ?, ?, ?)
+            ON CONFLICT(graph_id, url_slug) DO NOTHING
+            RETURNING *
             """,
             (
                 graph_id,
@@ -555,10 +633,16 @@ class SQLiteAdapter(DatabaseAdapter):
                 now,
             ),
         )
+        rows = await cursor.fetchall()
+        if rows:
+            await self._bump_etag_version(graph_id)
         await self.db.commit()
 
-        return await self.get_topic(graph_id, data.url_slug)
+        if not rows:
+            raise DuplicateEntryError(f"Topic with slug {data.url_slug} already exists")
+        return self._row_to_topic(rows[0])
 
+    @_serialized_write
     async def update_topic(
         self, graph_id: str, url_slug: str, data: TopicUpdate
     ) -> Topic:
@@ -605,10 +689,12 @@ class SQLiteAdapter(DatabaseAdapter):
                 f"UPDATE kg_topics SET {', '.join(updates)} WHERE graph_id = ? AND url_slug = ?",
                 params,
             )
+            await self._bump_etag_version(graph_id)
             await self.db.commit()
 
         return await self.get_topic(graph_id, url_slug)
 
+    @_serialized_write
     async def delete_topic(self, graph_id: str, url_slug: str) -> None:
         """Delete a topic and its related edges."""
         # Delete edges involving this topic
@@ -637,33 +723,46 @@ class SQLiteAdapter(DatabaseAdapter):
             "DELETE FROM kg_topics WHERE graph_id = ? AND url_slug = ?",
             (graph_id, url_slug),
         )
+        await self._bump_etag_version(graph_id)
         await self.db.commit()
 
     async def get_topic_prerequisites(
-        self, graph_id: str, url_slug: str
+        self, graph_id: str, url_slug: str, max_depth: int = 1
     ) -> list[Topic]:
-        """Get prerequisite topics for a topic."""
-        topic = await self.get_topic(graph_id, url_slug)
-        if not topic or not topic.parent_slugs:
-            return []
+        """Get prerequisite topics for a topic, up to max_depth edges away."""
+        return await self._get_related_topics(
+            graph_id, url_slug, max_depth, from_col="child_slug", to_col="parent_slug"
+        )
 
-        placeholders = ",".join("?" * len(topic.parent_slugs))
-        cursor = await self.db.execute(
-            f"SELECT * FROM kg_topics WHERE graph_id = ? AND url_slug IN ({placeholders})",
-            [graph_id] + topic.parent_slugs,
+    async def get_topic_dependents(
+        self, graph_id: str, url_slug: str, max_depth: int = 1
+    ) -> list[Topic]:
+        """Get topics that depend on a topic, up to max_depth edges away."""
+        return await self._get_related_topics(
+            graph_id, url_slug, max_depth, from_col="parent_slug", to_col="child_slug"
         )
-        rows = await cursor.fetchall()
-        return [self._row_to_topic(row) for row in rows]
 
-    async def get_topic_dependents(self, graph_id: str, url_slug: str) -> list[Topic]:
-        """Get topics that depend on a topic."""
+    async def _get_related_topics(
+        self, graph_id: str, url_slug: str, max_depth: int, from_col: str, to_col: str
+    ) -> list[Topic]:
+        """Walk edges from a topic with a recursive CTE, nearest topics first."""
         cursor = await self.db.execute(
-            """
+            f"""
+            WITH RECURSIVE related(slug, depth) AS (
+                SELECT {to_col}, 1 FROM kg_edges
+                WHERE graph_id = :graph_id AND {from_col} = :url_slug
+                UNION
+                SELECT e.{to_col}, related.depth + 1 FROM kg_edges e
+                JOIN related ON e.{from_col} = related.slug
+                WHERE e.graph_id = :graph_id AND related.depth < :max_depth
+            )
             SELECT t.* FROM kg_topics t
-            JOIN kg_edges e ON t.graph_id = e.graph_id AND t.url_slug = e.child_slug
-            WHERE e.graph_id = ? AND e.parent_slug = ?
+            JOIN (SELECT slug, MIN(depth) AS depth FROM related GROUP BY slug) r
+                ON t.url_slug = r.slug
+            WHERE t.graph_id = :graph_id AND t.url_slug != :url_slug
+            ORDER BY r.depth, t.display_name
             """,
-            (graph_id, url_slug),
+            {"graph_id": graph_id, "url_slug": url_slug, "max_depth": max_depth},
         )
         rows = await cursor.fetchall()
         return [self._row_to_topic(row) for row in rows]
@@ -691,17 +790,26 @@ class SQLiteAdapter(DatabaseAdapter):
         row = await cursor.fetchone()
         return self._row_to_edge(row) if row else None
 
+    @_serialized_write
     async def create_edge(self, graph_id: str, data: EdgeCreate) -> Edge:
         """Create a new edge."""
         now = _now_iso()
 
-        await self.db.execute(
+        cursor = await self.db.execute(
             """
             INSERT INTO kg_edges (graph_id, parent_slug, child_slug, created_at)
             VALUES (?, ?, ?, ?)
+            ON CONFLICT(graph_id, parent_slug, child_slug) DO NOTHING
+            RETURNING *
             """,
             (graph_id, data.parent_slug, data.child_slug, now),
         )
+        rows = await cursor.fetchall()
+        if not rows:
+            await self.db.commit()
+            raise DuplicateEntryError(
+                f"Edge from {data.parent_slug} to {data.child_slug} already exists"
+            )
 
         # Update child topic's parent_slugs
         cursor = await self.db.execute(
@@ -718,9 +826,11 @@ class SQLiteAdapter(DatabaseAdapter):
                     (json.dumps(parent_slugs), now, graph_id, data.child_slug),
                 )
 
+        await self._bump_etag_version(graph_id)
         await self.db.commit()
-        return await self.get_edge(graph_id, data.parent_slug, data.child_slug)
+        return self._row_to_edge(rows[0])
 
+    @_serialized_write
     async def delete_edge(
         self, graph_id: str, parent_slug: str, child_slug: str
     ) -> None:
@@ -747,16 +857,80 @@ class SQLiteAdapter(DatabaseAdapter):
                     (json.dumps(parent_slugs), now, graph_id, child_slug),
                 )
 
+        await self._bump_etag_version(graph_id)
         await self.db.commit()
 
     # =========================================================================
     # Batch Operations
     # =========================================================================
 
+    @_serialized_write
     async def batch_update(
         self, graph_id: str, operations: BatchOperations
     ) -> BatchResult:
-        """Perform batch operations on a graph."""
+        """Perform batch operations on a graph.
+
+        Parameter rows are prepared up front, then each operation type is applied
+        with a single executemany() inside one write transaction. Conflicting
+        creates are skipped and only rows actually touched are counted.
+        """
+        now = _now_iso()
+        course_ops = operations.courses or BatchCoursesOperations()
+        topic_ops = operations.topics or BatchTopicsOperations()
+        edge_ops = operations.edges or BatchEdgesOperations()
+
+        edge_deletes = [
+            (graph_id, e.parent_slug, e.child_slug) for e in edge_ops.delete or []
+        ]
+        topic_deletes = list(dict.fromkeys(topic_ops.delete or []))
+        course_deletes = [(graph_id, course_id) for course_id in course_ops.delete or []]
+        course_creates = [(c.name.strip(), c.color) for c in course_ops.create or []]
+        topic_creates = [
+            (
+                graph_id,
+                t.url_slug,
+                t.display_name,
+                t.course_id,
+                t.content_html,
+                t.content_text,
+                1 if t.content_html or t.content_text else 0,
+                now,
+                now,
+            )
+            for t in topic_ops.create or []
+        ]
+        edge_creates = [
+            (graph_id, e.parent_slug, e.child_slug, now)
+            for e in edge_ops.create or []
+            if e.parent_slug != e.child_slug
+        ]
+        course_updates = [
+            (
+                u.data.name.strip() if u.data.name is not None else None,
+                u.data.color,
+                now,
+                graph_id,
+                u.course_id,
+            )
+            for u in course_ops.update or []
+        ]
+        topic_updates = [
+            {
+                "display_name": u.data.display_name,
+                "course_id": u.data.course_id,
+                "content_html": u.data.content_html,
+                "content_text": u.data.content_text,
+                "now": now,
+                "graph_id": graph_id,
+                "url_slug": u.url_slug,
+            }
+            for u in topic_ops.update or []
+        ]
+
+        # Children whose parent_slugs must be rebuilt from kg_edges afterwards
+        affected_children = {child for _, _, child in edge_deletes}
+        affected_children.update(child for _, _, child, _ in edge_creates)
+
         result = BatchResult(
             coursesCreated=0,
             coursesUpdated=0,
@@ -768,78 +942,131 @@ class SQLiteAdapter(DatabaseAdapter):
             edgesDeleted=0,
         )
 
-        # Process deletions first (edges -> topics -> courses)
-        if operations.edges and operations.edges.delete:
-            for edge_del in operations.edges.delete:
-                try:
-                    await self.delete_edge(
-                        graph_id, edge_del.parent_slug, edge_del.child_slug
-                    )
-                    result.edges_deleted += 1
-                except Exception:
-                    pass
-
-        if operations.topics and operations.topics.delete:
-            for url_slug in operations.topics.delete:
-                try:
-                    await self.delete_topic(graph_id, url_slug)
-                    result.topics_deleted += 1
-                except Exception:
-                    pass
-
-        if operations.courses and operations.courses.delete:
-            for course_id in operations.courses.delete:
-                try:
-                    await self.delete_course(graph_id, course_id)
-                    result.courses_deleted += 1
-                except Exception:
-                    pass
-
-        # Process creates (courses -> topics -> edges)
-        if operations.courses and operations.courses.create:
-            for course_data in operations.courses.create:
-                try:
-                    await self.create_course(graph_id, course_data)
-                    result.courses_created += 1
-                except Exception:
-                    pass
-
-        if operations.topics and operations.topics.create:
-            for topic_data in operations.topics.create:
-                try:
-                    await self.create_topic(graph_id, topic_data)
-                    result.topics_created += 1
-                except Exception:
-                    pass
-
-        if operations.edges and operations.edges.create:
-            for edge_data in operations.edges.create:
-                try:
-                    await self.create_edge(graph_id, edge_data)
-                    result.edges_created += 1
-                except Exception:
-                    pass
-
-        # Process updates (courses -> topics)
-        if operations.courses and operations.courses.update:
-            for course_update in operations.courses.update:
-                try:
-                    await self.update_course(
-                        graph_id, course_update.course_id, course_update.data
-                    )
-                    result.courses_updated += 1
-                except Exception:
-                    pass
-
-        if operations.topics and operations.topics.update:
-            for topic_update in operations.topics.update:
-                try:
-                    await self.update_topic(
-                        graph_id, topic_update.url_slug, topic_update.data
-                    )
-                    result.topics_updated += 1
-                except Exception:
-                    pass
+        # Other writes are held off by the write lock, so no transaction is open
+        await self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # Process deletions first (edges -> topics -> courses)
+            if edge_deletes:
+                cursor = await self.db.executemany(
+                    "DELETE FROM kg_edges WHERE graph_id = ? AND parent_slug = ? AND child_slug = ?",
+                    edge_deletes,
+                )
+                result.edges_deleted = cursor.rowcount
+
+            if topic_deletes:
+                placeholders = ",".join("?" * len(topic_deletes))
+                cursor = await self.db.execute(
+                    f"SELECT DISTINCT child_slug FROM kg_edges WHERE graph_id = ? AND parent_slug IN ({placeholders})",
+                    [graph_id] + topic_deletes,
+                )
+                affected_children.update(row["child_slug"] for row in await cursor.fetchall())
+
+                await self.db.executemany(
+                    "DELETE FROM kg_edges WHERE graph_id = ? AND (parent_slug = ? OR child_slug = ?)",
+                    [(graph_id, slug, slug) for slug in topic_deletes],
+                )
+                cursor = await self.db.executemany(
+                    "DELETE FROM kg_topics WHERE graph_id = ? AND url_slug = ?",
+                    [(graph_id, slug) for slug in topic_deletes],
+                )
+                result.topics_deleted = cursor.rowcount
+
+            if course_deletes:
+                cursor = await self.db.executemany(
+                    "DELETE FROM kg_courses WHERE graph_id = ? AND course_id = ?",
+                    course_deletes,
+                )
+                result.courses_deleted = cursor.rowcount
+
+            # Process creates (courses -> topics -> edges)
+            if course_creates:
+                cursor = await self.db.execute(
+                    "SELECT COALESCE(MAX(course_id), 0) as max_id FROM kg_courses WHERE graph_id = ?",
+                    (graph_id,),
+                )
+                max_id = (await cursor.fetchone())["max_id"]
+                cursor = await self.db.executemany(
+                    """
+                    INSERT INTO kg_courses (graph_id, course_id, name, color, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (graph_id, max_id + i, name, color, now, now)
+                        for i, (name, color) in enumerate(course_creates, start=1)
+                    ],
+                )
+                result.courses_created = cursor.rowcount
+
+            if topic_creates:
+                cursor = await self.db.executemany(
+                    """
+                    INSERT OR IGNORE INTO kg_topics (graph_id, url_slug, display_name, course_id, parent_slugs, content_html, content_text, has_content, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, '[]', ?, ?, ?, ?, ?)
+                    """,
+                    topic_creates,
+                )
+                result.topics_created = cursor.rowcount
+
+            if edge_creates:
+                cursor = await self.db.executemany(
+                    """
+                    INSERT OR IGNORE INTO kg_edges (graph_id, parent_slug, child_slug, created_at)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    edge_creates,
+                )
+                result.edges_created = cursor.rowcount
+
+            # Process updates (courses -> topics)
+            if course_updates:
+                cursor = await self.db.executemany(
+                    """
+                    UPDATE kg_courses SET name = COALESCE(?, name), color = COALESCE(?, color), updated_at = ?
+                    WHERE graph_id = ? AND course_id = ?
+                    """,
+                    course_updates,
+                )
+                result.courses_updated = cursor.rowcount
+
+            if topic_updates:
+                cursor = await self.db.executemany(
+                    """
+                    UPDATE kg_topics SET
+                        display_name = COALESCE(:display_name, display_name),
+                        course_id = COALESCE(:course_id, course_id),
+                        content_html = COALESCE(:content_html, content_html),
+                        content_text = COALESCE(:content_text, content_text),
+                        has_content = COALESCE(:content_html, content_html, '') != ''
+                            OR COALESCE(:content_text, content_text, '') != '',
+                        updated_at = :now
+                    WHERE graph_id = :graph_id AND url_slug = :url_slug
+                    """,
+                    topic_updates,
+                )
+                result.topics_updated = cursor.rowcount
+
+            # Rebuild parent_slugs of every child whose incoming edges changed
+            if affected_children:
+                await self.db.executemany(
+                    """
+                    UPDATE kg_topics SET parent_slugs = (
+                        SELECT json_group_array(parent_slug) FROM (
+                            SELECT parent_slug FROM kg_edges
+                            WHERE graph_id = ? AND child_slug = ? ORDER BY id
+                        )
+                    ), updated_at = ?
+                    WHERE graph_id = ? AND url_slug = ?
+                    """,
+                    [
+                        (graph_id, slug, now, graph_id, slug)
+                        for slug in affected_children
+                    ],
+                )
+
+            await self._bump_etag_version(graph_id)
+        except Exception:
+            await self.db.rollback()
+            raise
 
         await self.db.commit()
         return result
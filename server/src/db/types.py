@@ -21,6 +21,10 @@ from src.models import (
 )
 
 
+class DuplicateEntryError(Exception):
+    """Raised when a create would violate a uniqueness constraint."""
+
+
 class DatabaseAdapter(ABC):
     """Abstract base class for database adapters."""
 
@@ -39,8 +43,10 @@ class DatabaseAdapter(ABC):
     # =========================================================================
 
     @abstractmethod
-    async def list_graphs(self) -> list[KnowledgeGraph]:
-        """List all knowledge graphs."""
+    async def list_graphs(
+        self, is_default: Optional[bool] = None, is_readonly: Optional[bool] = None
+    ) -> list[KnowledgeGraph]:
+        """List knowledge graphs, optionally filtered by default/readonly flags."""
         pass
 
     @abstractmethod
@@ -74,6 +80,11 @@ class DatabaseAdapter(ABC):
         """List all courses in a graph."""
         pass
 
+    @abstractmethod
+    async def count_courses(self, graph_id: str) -> int:
+        """Count the courses in a graph."""
+        pass
+
     @abstractmethod
     async def get_course(self, graph_id: str, course_id: int) -> Optional[Course]:
         """Get a course by ID."""
@@ -112,7 +123,7 @@ class DatabaseAdapter(ABC):
 
     @abstractmethod
     async def create_topic(self, graph_id: str, data: TopicCreate) -> Topic:
-        """Create a new topic."""
+        """Create a new topic, raising DuplicateEntryError if the slug exists."""
         pass
 
     @abstractmethod
@@ -128,13 +139,17 @@ class DatabaseAdapter(ABC):
         pass
 
     @abstractmethod
-    async def get_topic_prerequisites(self, graph_id: str, url_slug: str) -> list[Topic]:
-        """Get prerequisite topics for a topic."""
+    async def get_topic_prerequisites(
+        self, graph_id: str, url_slug: str, max_depth: int = 1
+    ) -> list[Topic]:
+        """Get prerequisite topics for a topic, up to max_depth edges away."""
         pass
 
     @abstractmethod
-    async def get_topic_dependents(self, graph_id: str, url_slug: str) -> list[Topic]:
-        """Get topics that depend on a topic."""
+    async def get_topic_dependents(
+        self, graph_id: str, url_slug: str, max_depth: int = 1
+    ) -> list[Topic]:
+        """Get topics that depend on a topic, up to max_depth edges away."""
         pass
 
     # =========================================================================
@@ -155,7 +170,7 @@ class DatabaseAdapter(ABC):
 
     @abstractmethod
     async def create_edge(self, graph_id: str, data: EdgeCreate) -> Edge:
-        """Create a new edge."""
+        """Create a new edge, raising DuplicateEntryError if it already exists."""
         pass
 
     @abstractmethod
@@ -0,0 +1,69 @@
+"""HTTP errors returned by the API."""
+
+from fastapi import HTTPException
+
+# Details with fixed messages are built once and shared by every raise
+_READONLY_GRAPH = {"code": "READONLY_GRAPH", "message": "Cannot modify read-only graph"}
+_CANNOT_DELETE_DEFAULT = {
+    "code": "CANNOT_DELETE_DEFAULT",
+    "message": "Cannot delete default graph",
+}
+
+
+def validation_error(message: str) -> HTTPException:
+    """400 for invalid request data."""
+    return HTTPException(
+        status_code=400, detail={"code": "VALIDATION_ERROR", "message": message}
+    )
+
+
+def graph_not_found(graph_id: str, label: str = "Graph") -> HTTPException:
+    """404 for a missing graph."""
+    return HTTPException(
+        status_code=404,
+        detail={"code": "GRAPH_NOT_FOUND", "message": f"{label} {graph_id} not found"},
+    )
+
+
+def course_not_found(course_id: int) -> HTTPException:
+    """404 for a missing course."""
+    return HTTPException(
+        status_code=404,
+        detail={"code": "COURSE_NOT_FOUND", "message": f"Course {course_id} not found"},
+    )
+
+
+def topic_not_found(url_slug: str, label: str = "Topic") -> HTTPException:
+    """404 for a missing topic."""
+    return HTTPException(
+        status_code=404,
+        detail={"code": "TOPIC_NOT_FOUND", "message": f"{label} {url_slug} not found"},
+    )
+
+
+def edge_not_found(parent_slug: str, child_slug: str) -> HTTPException:
+    """404 for a missing edge."""
+    return HTTPException(
+        status_code=404,
+        detail={
+            "code": "EDGE_NOT_FOUND",
+            "message": f"Edge from {parent_slug} to {child_slug} not found",
+        },
+    )
+
+
+def duplicate_entry(message: str) -> HTTPException:
+    """409 for a resource that already exists."""
+    return HTTPException(
+        status_code=409, detail={"code": "DUPLICATE_ENTRY", "message": message}
+    )
+
+
+def readonly_graph() -> HTTPException:
+    """409 for writes to a read-only graph."""
+    return HTTPException(status_code=409, detail=_READONLY_GRAPH)
+
+
+def cannot_delete_default() -> HTTPException:
+    """409 for deleting the default graph."""
+    return HTTPException(status_code=409, detail=_CANNOT_DELETE_DEFAULT)
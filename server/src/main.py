@@ -7,7 +7,9 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.cache import GraphSnapshotCache
 from src.db.factory import create_database_adapter
+from src.responses import ORJSONResponse
 from src.routes.graphs import router as graphs_router
 
 # Load environment variables
@@ -21,6 +23,7 @@ async def lifespan(app: FastAPI):
     db = create_database_adapter()
     await db.initialize()
     app.state.db = db
+    app.state.snapshots = GraphSnapshotCache()
 
     yield
 
@@ -34,6 +37,7 @@ app = FastAPI(
     description="API for managing knowledge graphs with courses, topics, and prerequisites",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -40,6 +40,8 @@ class KnowledgeGraph(KnowledgeGraphBase):
     is_default: bool = Field(alias="isDefault")
     is_readonly: bool = Field(alias="isReadonly")
     source_graph_id: Optional[str] = Field(None, alias="sourceGraphId")
+    # Bumped on every write to the graph; used for ETags, never serialized
+    etag_version: int = Field(0, alias="etagVersion", exclude=True)
     created_at: str = Field(alias="createdAt")
     updated_at: str = Field(alias="updatedAt")
 
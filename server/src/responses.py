@@ -0,0 +1,14 @@
+"""Response classes for the API."""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        """Serialize with orjson as compact, non-ASCII-escaped UTF-8, like JSONResponse."""
+        return orjson.dumps(content)
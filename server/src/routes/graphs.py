@@ -1,10 +1,22 @@
 """API routes for knowledge graphs."""
 
-from typing import Any
-
-from fastapi import APIRouter, Depends, HTTPException, Request
-
-from src.db.types import DatabaseAdapter
+import asyncio
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+
+from src.cache import GraphSnapshotCache
+from src.db.types import DatabaseAdapter, DuplicateEntryError
+from src.errors import (
+    cannot_delete_default,
+    course_not_found,
+    duplicate_entry,
+    edge_not_found,
+    graph_not_found,
+    readonly_graph,
+    topic_not_found,
+    validation_error,
+)
 from src.models import (
     BatchOperations,
     BatchResult,
@@ -22,9 +34,16 @@ from src.models import (
     TopicCreate,
     TopicUpdate,
 )
+from src.responses import ORJSONResponse
 
 router = APIRouter(prefix="/api/v1/graphs", tags=["graphs"])
 
+# Full graph payloads with more rows than this are serialized off the event loop
+THREADED_DUMP_MIN_ROWS = 500
+
+# Upper bound for maxDepth; cycles keep the recursive walk going until this depth
+MAX_TOPIC_DEPTH = 50
+
 
 # =============================================================================
 # Dependency Injection
@@ -32,33 +51,34 @@ router = APIRouter(prefix="/api/v1/graphs", tags=["graphs"])
 
 
 async def get_db(request: Request) -> DatabaseAdapter:
-    """Get database adapter from app state."""
+    """Get database adapter from app state.
+
+    Kept async so FastAPI awaits it inline rather than running it in the
+    threadpool. It is resolved once per request and shared with the graph
+    dependencies through FastAPI's per-request dependency cache.
+    """
     return request.app.state.db
 
 
+async def get_snapshots(request: Request) -> GraphSnapshotCache:
+    """Get graph snapshot cache from app state."""
+    return request.app.state.snapshots
+
+
 async def get_graph_or_404(
     graph_id: str, db: DatabaseAdapter = Depends(get_db)
 ) -> KnowledgeGraph:
     """Get graph or raise 404."""
     graph = await db.get_graph(graph_id)
     if not graph:
-        raise HTTPException(
-            status_code=404,
-            detail={"code": "GRAPH_NOT_FOUND", "message": f"Graph {graph_id} not found"},
-        )
+        raise graph_not_found(graph_id)
     return graph
 
 
 async def require_writable(graph: KnowledgeGraph = Depends(get_graph_or_404)) -> KnowledgeGraph:
     """Require graph to be writable."""
     if graph.is_readonly:
-        raise HTTPException(
-            status_code=409,
-            detail={
-                "code": "READONLY_GRAPH",
-                "message": "Cannot modify read-only graph",
-            },
-        )
+        raise readonly_graph()
     return graph
 
 
@@ -67,9 +87,45 @@ async def require_writable(graph: KnowledgeGraph = Depends(get_graph_or_404)) ->
 # =============================================================================
 
 
-def success_response(data: Any, status_code: int = 200) -> dict:
-    """Create a success response."""
-    return {"success": True, "data": data}
+def success_response(
+    data: Any, status_code: int = 200, headers: Optional[dict[str, str]] = None
+) -> ORJSONResponse:
+    """Create a success response.
+
+    The envelope is rendered straight to bytes, so FastAPI does not run it
+    through jsonable_encoder again.
+    """
+    return ORJSONResponse(
+        {"success": True, "data": data}, status_code=status_code, headers=headers
+    )
+
+
+def graph_etag(graph: KnowledgeGraph) -> str:
+    """ETag for the current contents of a graph."""
+    return f'"{graph.id}:{graph.etag_version}"'
+
+
+def check_not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Return a 304 if the client already has the content tagged by etag."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+async def find_topic(
+    db: DatabaseAdapter,
+    snapshots: GraphSnapshotCache,
+    graph: KnowledgeGraph,
+    url_slug: str,
+) -> Optional[Topic]:
+    """Get a topic, answering from the graph's snapshot while it is current."""
+    topics = snapshots.get_topics(graph)
+    if topics is not None:
+        return topics.get(url_slug)
+    return await db.get_topic(graph.id, url_slug)
 
 
 # =============================================================================
@@ -78,41 +134,36 @@ def success_response(data: Any, status_code: int = 200) -> dict:
 
 
 @router.get("", response_model=None)
-async def list_graphs(db: DatabaseAdapter = Depends(get_db)) -> dict:
-    """List all knowledge graphs."""
-    graphs = await db.list_graphs()
+async def list_graphs(
+    is_default: Optional[bool] = Query(None, alias="isDefault"),
+    is_readonly: Optional[bool] = Query(None, alias="isReadonly"),
+    db: DatabaseAdapter = Depends(get_db),
+) -> Response:
+    """List knowledge graphs, optionally filtered by isDefault/isReadonly."""
+    graphs = await db.list_graphs(is_default=is_default, is_readonly=is_readonly)
     return success_response([g.model_dump(by_alias=True) for g in graphs])
 
 
 @router.post("", response_model=None, status_code=201)
 async def create_graph(
     data: KnowledgeGraphCreate, db: DatabaseAdapter = Depends(get_db)
-) -> dict:
+) -> Response:
     """Create a new knowledge graph."""
     if not data.name or not data.name.strip():
-        raise HTTPException(
-            status_code=400,
-            detail={"code": "VALIDATION_ERROR", "message": "Name is required"},
-        )
+        raise validation_error("Name is required")
 
     # Check if copyFromGraphId exists
     if data.copy_from_graph_id:
         source = await db.get_graph(data.copy_from_graph_id)
         if not source:
-            raise HTTPException(
-                status_code=404,
-                detail={
-                    "code": "GRAPH_NOT_FOUND",
-                    "message": f"Source graph {data.copy_from_graph_id} not found",
-                },
-            )
+            raise graph_not_found(data.copy_from_graph_id, "Source graph")
 
     graph = await db.create_graph(data)
-    return success_response(graph.model_dump(by_alias=True))
+    return success_response(graph.model_dump(by_alias=True), status_code=201)
 
 
 @router.get("/{graph_id}", response_model=None)
-async def get_graph(graph: KnowledgeGraph = Depends(get_graph_or_404)) -> dict:
+async def get_graph(graph: KnowledgeGraph = Depends(get_graph_or_404)) -> Response:
     """Get a knowledge graph by ID."""
     return success_response(graph.model_dump(by_alias=True))
 
@@ -122,7 +173,7 @@ async def update_graph(
     data: KnowledgeGraphUpdate,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Update a knowledge graph."""
     updated = await db.update_graph(graph.id, data)
     return success_response(updated.model_dump(by_alias=True))
@@ -132,18 +183,14 @@ async def update_graph(
 async def delete_graph(
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+    snapshots: GraphSnapshotCache = Depends(get_snapshots),
+) -> Response:
     """Delete a knowledge graph."""
     if graph.is_default:
-        raise HTTPException(
-            status_code=409,
-            detail={
-                "code": "CANNOT_DELETE_DEFAULT",
-                "message": "Cannot delete default graph",
-            },
-        )
+        raise cannot_delete_default()
 
     await db.delete_graph(graph.id)
+    snapshots.invalidate(graph.id)
     return success_response({"deleted": True})
 
 
@@ -154,12 +201,18 @@ async def delete_graph(
 
 @router.get("/{graph_id}/courses", response_model=None)
 async def list_courses(
+    request: Request,
     graph: KnowledgeGraph = Depends(get_graph_or_404),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """List all courses in a graph."""
+    etag = graph_etag(graph)
+    not_modified = check_not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
     courses = await db.list_courses(graph.id)
-    return success_response([c.model_dump(by_alias=True) for c in courses])
+    return success_response([c.model_dump(by_alias=True) for c in courses], headers={"ETag": etag})
 
 
 @router.post("/{graph_id}/courses", response_model=None, status_code=201)
@@ -167,21 +220,25 @@ async def create_course(
     data: CourseCreate,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Create a new course."""
     if not data.name or not data.name.strip():
-        raise HTTPException(
-            status_code=400,
-            detail={"code": "VALIDATION_ERROR", "message": "Name is required"},
-        )
+        raise validation_error("Name is required")
     if not data.color:
-        raise HTTPException(
-            status_code=400,
-            detail={"code": "VALIDATION_ERROR", "message": "Color is required"},
-        )
+        raise validation_error("Color is required")
 
     course = await db.create_course(graph.id, data)
-    return success_response(course.model_dump(by_alias=True))
+    return success_response(course.model_dump(by_alias=True), status_code=201)
+
+
+@router.get("/{graph_id}/courses/count", response_model=None)
+async def count_courses(
+    graph: KnowledgeGraph = Depends(get_graph_or_404),
+    db: DatabaseAdapter = Depends(get_db),
+) -> Response:
+    """Count the courses in a graph."""
+    total = await db.count_courses(graph.id)
+    return success_response({"total": total})
 
 
 @router.get("/{graph_id}/courses/{course_id}", response_model=None)
@@ -189,17 +246,11 @@ async def get_course(
     course_id: int,
     graph: KnowledgeGraph = Depends(get_graph_or_404),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Get a course by ID."""
     course = await db.get_course(graph.id, course_id)
     if not course:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "COURSE_NOT_FOUND",
-                "message": f"Course {course_id} not found",
-            },
-        )
+        raise course_not_found(course_id)
     return success_response(course.model_dump(by_alias=True))
 
 
@@ -209,17 +260,11 @@ async def update_course(
     data: CourseUpdate,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Update a course."""
     course = await db.get_course(graph.id, course_id)
     if not course:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "COURSE_NOT_FOUND",
-                "message": f"Course {course_id} not found",
-            },
-        )
+        raise course_not_found(course_id)
 
     updated = await db.update_course(graph.id, course_id, data)
     return success_response(updated.model_dump(by_alias=True))
@@ -230,17 +275,11 @@ async def delete_course(
     course_id: int,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Delete a course."""
     course = await db.get_course(graph.id, course_id)
     if not course:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "COURSE_NOT_FOUND",
-                "message": f"Course {course_id} not found",
-            },
-        )
+        raise course_not_found(course_id)
 
     await db.delete_course(graph.id, course_id)
     return success_response({"deleted": True})
@@ -253,12 +292,20 @@ async def delete_course(
 
 @router.get("/{graph_id}/topics", response_model=None)
 async def list_topics(
+    request: Request,
     graph: KnowledgeGraph = Depends(get_graph_or_404),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+    snapshots: GraphSnapshotCache = Depends(get_snapshots),
+) -> Response:
     """List all topics in a graph."""
+    etag = graph_etag(graph)
+    not_modified = check_not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
     topics = await db.list_topics(graph.id)
-    return success_response([t.model_dump(by_alias=True) for t in topics])
+    snapshots.store_topics(graph, topics)
+    return success_response([t.model_dump(by_alias=True) for t in topics], headers={"ETag": etag})
 
 
 @router.post("/{graph_id}/topics", response_model=None, status_code=201)
@@ -266,43 +313,24 @@ async def create_topic(
     data: TopicCreate,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Create a new topic."""
     if not data.url_slug or not data.url_slug.strip():
-        raise HTTPException(
-            status_code=400,
-            detail={"code": "VALIDATION_ERROR", "message": "URL slug is required"},
-        )
+        raise validation_error("URL slug is required")
     if not data.display_name or not data.display_name.strip():
-        raise HTTPException(
-            status_code=400,
-            detail={"code": "VALIDATION_ERROR", "message": "Display name is required"},
-        )
+        raise validation_error("Display name is required")
 
     # Check if course exists
     course = await db.get_course(graph.id, data.course_id)
     if not course:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "COURSE_NOT_FOUND",
-                "message": f"Course {data.course_id} not found",
-            },
-        )
-
-    # Check for duplicate slug
-    existing = await db.get_topic(graph.id, data.url_slug)
-    if existing:
-        raise HTTPException(
-            status_code=409,
-            detail={
-                "code": "DUPLICATE_ENTRY",
-                "message": f"Topic with slug {data.url_slug} already exists",
-            },
-        )
+        raise course_not_found(data.course_id)
 
-    topic = await db.create_topic(graph.id, data)
-    return success_response(topic.model_dump(by_alias=True))
+    # Duplicate slugs are rejected by the insert itself
+    try:
+        topic = await db.create_topic(graph.id, data)
+    except DuplicateEntryError as e:
+        raise duplicate_entry(str(e))
+    return success_response(topic.model_dump(by_alias=True), status_code=201)
 
 
 @router.get("/{graph_id}/topics/{url_slug}", response_model=None)
@@ -310,17 +338,12 @@ async def get_topic(
     url_slug: str,
     graph: KnowledgeGraph = Depends(get_graph_or_404),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+    snapshots: GraphSnapshotCache = Depends(get_snapshots),
+) -> Response:
     """Get a topic by URL slug."""
-    topic = await db.get_topic(graph.id, url_slug)
+    topic = await find_topic(db, snapshots, graph, url_slug)
     if not topic:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "TOPIC_NOT_FOUND",
-                "message": f"Topic {url_slug} not found",
-            },
-        )
+        raise topic_not_found(url_slug)
     return success_response(topic.model_dump(by_alias=True))
 
 
@@ -330,29 +353,24 @@ async def update_topic(
     data: TopicUpdate,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+    snapshots: GraphSnapshotCache = Depends(get_snapshots),
+) -> Response:
     """Update a topic."""
-    topic = await db.get_topic(graph.id, url_slug)
-    if not topic:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "TOPIC_NOT_FOUND",
-                "message": f"Topic {url_slug} not found",
-            },
+    # Look up the topic and the new course (if any) together
+    if data.course_id is not None:
+        topic, course = await asyncio.gather(
+            find_topic(db, snapshots, graph, url_slug),
+            db.get_course(graph.id, data.course_id),
         )
+    else:
+        topic, course = await find_topic(db, snapshots, graph, url_slug), None
+
+    if not topic:
+        raise topic_not_found(url_slug)
 
     # Check if new course exists
-    if data.course_id is not None:
-        course = await db.get_course(graph.id, data.course_id)
-        if not course:
-            raise HTTPException(
-                status_code=404,
-                detail={
-                    "code": "COURSE_NOT_FOUND",
-                    "message": f"Course {data.course_id} not found",
-                },
-            )
+    if data.course_id is not None and not course:
+        raise course_not_found(data.course_id)
 
     updated = await db.update_topic(graph.id, url_slug, data)
     return success_response(updated.model_dump(by_alias=True))
@@ -363,17 +381,12 @@ async def delete_topic(
     url_slug: str,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+    snapshots: GraphSnapshotCache = Depends(get_snapshots),
+) -> Response:
     """Delete a topic."""
-    topic = await db.get_topic(graph.id, url_slug)
+    topic = await find_topic(db, snapshots, graph, url_slug)
     if not topic:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "TOPIC_NOT_FOUND",
-                "message": f"Topic {url_slug} not found",
-            },
-        )
+        raise topic_not_found(url_slug)
 
     await db.delete_topic(graph.id, url_slug)
     return success_response({"deleted": True})
@@ -382,42 +395,32 @@ async def delete_topic(
 @router.get("/{graph_id}/topics/{url_slug}/prerequisites", response_model=None)
 async def get_topic_prerequisites(
     url_slug: str,
+    max_depth: int = Query(1, ge=1, le=MAX_TOPIC_DEPTH, alias="maxDepth"),
     graph: KnowledgeGraph = Depends(get_graph_or_404),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Get prerequisite topics for a topic."""
     topic = await db.get_topic(graph.id, url_slug)
     if not topic:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "TOPIC_NOT_FOUND",
-                "message": f"Topic {url_slug} not found",
-            },
-        )
+        raise topic_not_found(url_slug)
 
-    prerequisites = await db.get_topic_prerequisites(graph.id, url_slug)
+    prerequisites = await db.get_topic_prerequisites(graph.id, url_slug, max_depth)
     return success_response([t.model_dump(by_alias=True) for t in prerequisites])
 
 
 @router.get("/{graph_id}/topics/{url_slug}/dependents", response_model=None)
 async def get_topic_dependents(
     url_slug: str,
+    max_depth: int = Query(1, ge=1, le=MAX_TOPIC_DEPTH, alias="maxDepth"),
     graph: KnowledgeGraph = Depends(get_graph_or_404),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Get topics that depend on a topic."""
     topic = await db.get_topic(graph.id, url_slug)
     if not topic:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "TOPIC_NOT_FOUND",
-                "message": f"Topic {url_slug} not found",
-            },
-        )
+        raise topic_not_found(url_slug)
 
-    dependents = await db.get_topic_dependents(graph.id, url_slug)
+    dependents = await db.get_topic_dependents(graph.id, url_slug, max_depth)
     return success_response([t.model_dump(by_alias=True) for t in dependents])
 
 
@@ -428,12 +431,18 @@ async def get_topic_dependents(
 
 @router.get("/{graph_id}/edges", response_model=None)
 async def list_edges(
+    request: Request,
     graph: KnowledgeGraph = Depends(get_graph_or_404),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """List all edges in a graph."""
+    etag = graph_etag(graph)
+    not_modified = check_not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
     edges = await db.list_edges(graph.id)
-    return success_response([e.model_dump(by_alias=True) for e in edges])
+    return success_response([e.model_dump(by_alias=True) for e in edges], headers={"ETag": etag})
 
 
 @router.post("/{graph_id}/edges", response_model=None, status_code=201)
@@ -441,53 +450,32 @@ async def create_edge(
     data: EdgeCreate,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Create a new edge (prerequisite relationship)."""
     # Check self-reference
     if data.parent_slug == data.child_slug:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "code": "VALIDATION_ERROR",
-                "message": "Cannot create self-referencing edge",
-            },
-        )
+        raise validation_error("Cannot create self-referencing edge")
+
+    # Look up both endpoints together
+    parent, child = await asyncio.gather(
+        db.get_topic(graph.id, data.parent_slug),
+        db.get_topic(graph.id, data.child_slug),
+    )
 
     # Check parent topic exists
-    parent = await db.get_topic(graph.id, data.parent_slug)
     if not parent:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "TOPIC_NOT_FOUND",
-                "message": f"Parent topic {data.parent_slug} not found",
-            },
-        )
+        raise topic_not_found(data.parent_slug, "Parent topic")
 
     # Check child topic exists
-    child = await db.get_topic(graph.id, data.child_slug)
     if not child:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "TOPIC_NOT_FOUND",
-                "message": f"Child topic {data.child_slug} not found",
-            },
-        )
-
-    # Check for duplicate edge
-    existing = await db.get_edge(graph.id, data.parent_slug, data.child_slug)
-    if existing:
-        raise HTTPException(
-            status_code=409,
-            detail={
-                "code": "DUPLICATE_ENTRY",
-                "message": f"Edge from {data.parent_slug} to {data.child_slug} already exists",
-            },
-        )
+        raise topic_not_found(data.child_slug, "Child topic")
 
-    edge = await db.create_edge(graph.id, data)
-    return success_response(edge.model_dump(by_alias=True))
+    # Duplicate edges are rejected by the insert itself
+    try:
+        edge = await db.create_edge(graph.id, data)
+    except DuplicateEntryError as e:
+        raise duplicate_entry(str(e))
+    return success_response(edge.model_dump(by_alias=True), status_code=201)
 
 
 @router.delete("/{graph_id}/edges/{parent_slug}/{child_slug}", response_model=None)
@@ -496,17 +484,11 @@ async def delete_edge(
     child_slug: str,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Delete an edge."""
     edge = await db.get_edge(graph.id, parent_slug, child_slug)
     if not edge:
-        raise HTTPException(
-            status_code=404,
-            detail={
-                "code": "EDGE_NOT_FOUND",
-                "message": f"Edge from {parent_slug} to {child_slug} not found",
-            },
-        )
+        raise edge_not_found(parent_slug, child_slug)
 
     await db.delete_edge(graph.id, parent_slug, child_slug)
     return success_response({"deleted": True})
@@ -522,7 +504,7 @@ async def batch_operations(
     data: BatchOperations,
     graph: KnowledgeGraph = Depends(require_writable),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Perform batch operations on a graph."""
     result = await db.batch_update(graph.id, data)
     return success_response(result.model_dump(by_alias=True))
@@ -535,14 +517,22 @@ async def batch_operations(
 
 @router.get("/{graph_id}/data", response_model=None)
 async def get_full_graph_data(
+    request: Request,
     graph: KnowledgeGraph = Depends(get_graph_or_404),
     db: DatabaseAdapter = Depends(get_db),
-) -> dict:
+) -> Response:
     """Get complete graph data including all courses, topics, and edges."""
+    etag = graph_etag(graph)
+    not_modified = check_not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
     data = await db.get_full_graph_data(graph.id)
-    return success_response({
-        "graph": data.graph.model_dump(by_alias=True),
-        "courses": [c.model_dump(by_alias=True) for c in data.courses],
-        "topics": [t.model_dump(by_alias=True) for t in data.topics],
-        "edges": [e.model_dump(by_alias=True) for e in data.edges],
-    })
+
+    # Serialize large graphs in a worker thread to keep the event loop free
+    row_count = len(data.courses) + len(data.topics) + len(data.edges)
+    if row_count > THREADED_DUMP_MIN_ROWS:
+        payload = await asyncio.to_thread(data.model_dump, by_alias=True)
+    else:
+        payload = data.model_dump(by_alias=True)
+    return success_response(payload, headers={"ETag": etag})
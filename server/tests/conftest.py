@@ -1,37 +1,188 @@
 """Pytest configuration and fixtures."""
 
-import os
-import tempfile
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
+import orjson
 import pytest
-from httpx import ASGITransport, AsyncClient
+from httpx import ASGITransport, AsyncClient, Headers
 
+try:
+    import uvloop
+except ImportError:  # uvloop is unavailable on Windows
+    uvloop = None
+
+from src.cache import GraphSnapshotCache
 from src.db.adapters.sqlite import SQLiteAdapter
 from src.main import app
+from src.models import CourseCreate, KnowledgeGraphCreate
 
 
-@pytest.fixture
+if uvloop is not None:
+
+    def pytest_asyncio_loop_factories(config, item):
+        """Run async tests and fixtures on uvloop when it is installed."""
+        return {"uvloop": uvloop.new_event_loop}
+
+
+class ORJSONClient(AsyncClient):
+    """AsyncClient that encodes json= request bodies with orjson."""
+
+    def build_request(self, method: str, url: Any, *, json: Any = None, **kwargs: Any):
+        """Build a request, sending json= as orjson-encoded content."""
+        if json is not None:
+            headers = Headers(kwargs.pop("headers", None))
+            headers["Content-Type"] = "application/json"
+            kwargs["content"] = orjson.dumps(json)
+            kwargs["headers"] = headers
+        return super().build_request(method, url, **kwargs)
+
+
+@pytest.fixture(scope="session")
 async def db() -> AsyncGenerator[SQLiteAdapter, None]:
-    """Create a temporary database for testing."""
-    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
-        db_path = f.name
+    """Create an in-memory database shared by the whole test session.
 
-    adapter = SQLiteAdapter(db_path=db_path)
+    The adapter holds a single connection, so the database lives as long as
+    the session. Under pytest-xdist each worker process gets its own.
+    """
+    adapter = SQLiteAdapter(db_path=":memory:")
     await adapter.initialize()
 
     yield adapter
 
     await adapter.close()
-    os.unlink(db_path)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 async def client(db: SQLiteAdapter) -> AsyncGenerator[AsyncClient, None]:
-    """Create an async HTTP client for testing the API."""
+    """Create an async HTTP client shared by the whole test session."""
     app.state.db = db
+    app.state.snapshots = GraphSnapshotCache()
 
-    async with AsyncClient(
+    # ASGITransport calls the app directly, so there is no connection pool to
+    # tune; httpx ignores limits= whenever a custom transport is given
+    async with ORJSONClient(
         transport=ASGITransport(app=app), base_url="http://test"
     ) as client:
         yield client
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def _warmup(client: AsyncClient) -> None:
+    """Hit the app once per endpoint so the first test doesn't pay cold-start costs."""
+    await client.get("/health")
+
+    response = await client.post("/api/v1/graphs", json={"name": "Warmup"})
+    graph_id = response.json()["data"]["id"]
+    base = f"/api/v1/graphs/{graph_id}"
+
+    await client.get("/api/v1/graphs")
+    await client.post(f"{base}/courses", json={"name": "Warmup", "color": "#000000"})
+    await client.post(
+        f"{base}/topics",
+        json={"urlSlug": "warmup-a", "displayName": "Warmup A", "courseId": 1},
+    )
+    await client.post(
+        f"{base}/batch",
+        json={
+            "topics": {
+                "create": [
+                    {"urlSlug": "warmup-b", "displayName": "Warmup B", "courseId": 1}
+                ]
+            }
+        },
+    )
+    await client.post(
+        f"{base}/edges", json={"parentSlug": "warmup-a", "childSlug": "warmup-b"}
+    )
+    await client.delete(base)
+
+
+@pytest.fixture(scope="session")
+async def default_graph(client: AsyncClient) -> dict[str, Any]:
+    """The default graph as returned by the API.
+
+    No test can modify or delete it, so it is fetched once per session.
+    """
+    response = await client.get("/api/v1/graphs", params={"isDefault": "true"})
+    return response.json()["data"][0]
+
+
+@pytest.fixture(scope="session")
+def default_graph_id(default_graph: dict[str, Any]) -> str:
+    """ID of the default graph."""
+    return default_graph["id"]
+
+
+@pytest.fixture(scope="session")
+async def default_readonly_graph_id(client: AsyncClient) -> str:
+    """ID of a readonly graph, fetched once per session."""
+    response = await client.get("/api/v1/graphs", params={"isReadonly": "true"})
+    return response.json()["data"][0]["id"]
+
+
+@pytest.fixture
+async def seeded_graph(db: SQLiteAdapter) -> tuple[str, int]:
+    """A new graph with one course, written straight through the adapter.
+
+    Returns (graph_id, course_id). The graph is removed by _reset_db.
+    """
+    graph = await db.create_graph(KnowledgeGraphCreate(name="Topic Test Graph"))
+    course = await db.create_course(
+        graph.id, CourseCreate(name="Test Course", color="#000000")
+    )
+    return graph.id, course.course_id
+
+
+@pytest.fixture(scope="module")
+async def seeded_graph_id(client: AsyncClient) -> AsyncGenerator[str, None]:
+    """A graph with a course, two topics and an edge, shared by a module.
+
+    Only read-only tests may use it. It outlives _reset_db because it is
+    created before the per-test snapshot is taken.
+    """
+    response = await client.post("/api/v1/graphs", json={"name": "Full Data Test"})
+    graph_id = response.json()["data"]["id"]
+    await client.post(
+        f"/api/v1/graphs/{graph_id}/batch",
+        json={
+            "courses": {"create": [{"name": "Test Course", "color": "#FF0000"}]},
+            "topics": {
+                "create": [
+                    {
+                        "urlSlug": "topic-1",
+                        "displayName": "Topic 1",
+                        "courseId": 1,
+                        "contentHtml": "<p>Content</p>",
+                    },
+                    {"urlSlug": "topic-2", "displayName": "Topic 2", "courseId": 1},
+                ]
+            },
+            "edges": {"create": [{"parentSlug": "topic-1", "childSlug": "topic-2"}]},
+        },
+    )
+
+    yield graph_id
+
+    await client.delete(f"/api/v1/graphs/{graph_id}")
+
+
+@pytest.fixture(autouse=True)
+async def _reset_db(db: SQLiteAdapter) -> AsyncGenerator[None, None]:
+    """Drop every graph the test created.
+
+    Graphs that existed before the test (the default graph and any from
+    wider-scoped fixtures) are kept. Courses, topics and edges go with their
+    graph via ON DELETE CASCADE, and course ids are numbered per graph, so
+    every test starts from courseId 1.
+    """
+    cursor = await db.db.execute("SELECT id FROM knowledge_graphs")
+    existing = [row["id"] for row in await cursor.fetchall()]
+
+    yield
+
+    placeholders = ", ".join("?" for _ in existing)
+    await db.db.execute(
+        f"DELETE FROM knowledge_graphs WHERE id NOT IN ({placeholders})", existing
+    )
+    await db.db.commit()
+    app.state.snapshots = GraphSnapshotCache()
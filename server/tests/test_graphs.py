@@ -1,8 +1,34 @@
 """Tests for knowledge graph API endpoints."""
 
+import asyncio
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Awaitable
+
+import orjson
 import pytest
 from httpx import AsyncClient
 
+from src.cache import GraphSnapshotCache
+from src.db.adapters.sqlite import SQLiteAdapter
+from src.main import app, health_check
+from src.models import BatchOperations, KnowledgeGraph
+from src.routes import graphs as graphs_routes
+
+# Shared request payloads; tests pass these as-is and must not mutate them
+TEST_GRAPH = {"name": "Test Graph"}
+TEST_COURSE = {"name": "Test Course", "color": "#000000"}
+
+
+async def pipeline(stages: list[list[Awaitable]]) -> None:
+    """Run setup requests stage by stage, each stage's requests concurrently.
+
+    Later stages may depend on rows created by earlier ones.
+    """
+    for stage in stages:
+        await asyncio.gather(*stage)
+
 
 class TestGraphEndpoints:
     """Tests for /api/v1/graphs endpoints."""
@@ -17,6 +43,36 @@ class TestGraphEndpoints:
         assert isinstance(data["data"], list)
         assert len(data["data"]) >= 1
 
+    async def test_list_graphs_default_filter(self, client: AsyncClient):
+        """Test filtering the graph list by isDefault."""
+        await client.post("/api/v1/graphs", json=TEST_GRAPH)
+
+        response = await client.get("/api/v1/graphs", params={"isDefault": "true"})
+        assert response.status_code == 200
+        graphs = response.json()["data"]
+        assert len(graphs) == 1
+        assert graphs[0]["isDefault"] is True
+
+        response = await client.get("/api/v1/graphs", params={"isDefault": "false"})
+        graphs = response.json()["data"]
+        assert len(graphs) >= 1
+        assert not any(g["isDefault"] for g in graphs)
+
+    async def test_list_graphs_readonly_filter(self, client: AsyncClient):
+        """Test filtering the graph list by isReadonly."""
+        await client.post("/api/v1/graphs", json=TEST_GRAPH)
+
+        response = await client.get("/api/v1/graphs", params={"isReadonly": "true"})
+        assert response.status_code == 200
+        graphs = response.json()["data"]
+        assert len(graphs) >= 1
+        assert all(g["isReadonly"] for g in graphs)
+
+        response = await client.get("/api/v1/graphs", params={"isReadonly": "false"})
+        graphs = response.json()["data"]
+        assert len(graphs) >= 1
+        assert not any(g["isReadonly"] for g in graphs)
+
     async def test_create_graph(self, client: AsyncClient):
         """Test creating a new graph."""
         response = await client.post(
@@ -34,12 +90,13 @@ class TestGraphEndpoints:
         assert "createdAt" in data["data"]
         assert "updatedAt" in data["data"]
 
-    async def test_create_graph_missing_name(self, client: AsyncClient):
+    @pytest.mark.parametrize("name", ["", "   "], ids=["empty", "blank"])
+    async def test_create_graph_missing_name(self, client: AsyncClient, name: str):
         """Test creating graph without name fails."""
-        response = await client.post("/api/v1/graphs", json={"name": ""})
+        response = await client.post("/api/v1/graphs", json={"name": name})
         assert response.status_code == 400
         data = response.json()
-        assert "VALIDATION_ERROR" in str(data)
+        assert data["detail"]["code"] == "VALIDATION_ERROR"
 
     async def test_get_graph(self, client: AsyncClient):
         """Test getting a specific graph."""
@@ -62,7 +119,7 @@ class TestGraphEndpoints:
         response = await client.get("/api/v1/graphs/nonexistent-id")
         assert response.status_code == 404
         data = response.json()
-        assert "GRAPH_NOT_FOUND" in str(data)
+        assert data["detail"]["code"] == "GRAPH_NOT_FOUND"
 
     async def test_update_graph(self, client: AsyncClient):
         """Test updating a graph."""
@@ -83,21 +140,21 @@ class TestGraphEndpoints:
         assert data["data"]["name"] == "Updated Name"
         assert data["data"]["description"] == "New description"
 
-    async def test_update_readonly_graph_fails(self, client: AsyncClient):
+    async def test_update_readonly_graph_fails(
+        self, client: AsyncClient, default_graph: dict
+    ):
         """Test updating a readonly graph fails."""
-        # Get the default (readonly) graph
-        list_response = await client.get("/api/v1/graphs")
-        default_graph = next(
-            g for g in list_response.json()["data"] if g["isDefault"]
-        )
+        assert default_graph["isReadonly"] is True
 
         response = await client.patch(
             f"/api/v1/graphs/{default_graph['id']}", json={"name": "New Name"}
         )
         assert response.status_code == 409
-        assert "READONLY_GRAPH" in str(response.json())
+        assert response.json()["detail"]["code"] == "READONLY_GRAPH"
 
-    async def test_delete_graph(self, client: AsyncClient):
+    async def test_delete_graph(
+        self, client: AsyncClient, db: SQLiteAdapter
+    ):
         """Test deleting a graph."""
         # Create a graph
         create_response = await client.post(
@@ -113,19 +170,18 @@ class TestGraphEndpoints:
         assert data["data"]["deleted"] is True
 
         # Verify it's deleted
-        get_response = await client.get(f"/api/v1/graphs/{graph_id}")
-        assert get_response.status_code == 404
+        assert await db.get_graph(graph_id) is None
 
-    async def test_delete_default_graph_fails(self, client: AsyncClient):
+    async def test_delete_default_graph_fails(
+        self, client: AsyncClient, default_graph_id: str
+    ):
         """Test deleting default graph fails."""
-        list_response = await client.get("/api/v1/graphs")
-        default_graph = next(
-            g for g in list_response.json()["data"] if g["isDefault"]
-        )
-
-        response = await client.delete(f"/api/v1/graphs/{default_graph['id']}")
+        response = await client.delete(f"/api/v1/graphs/{default_graph_id}")
         assert response.status_code == 409
-        assert "CANNOT_DELETE_DEFAULT" in str(response.json()) or "READONLY_GRAPH" in str(response.json())
+        assert response.json()["detail"]["code"] in (
+            "CANNOT_DELETE_DEFAULT",
+            "READONLY_GRAPH",
+        )
 
     async def test_copy_graph(self, client: AsyncClient):
         """Test copying a graph with all its data."""
@@ -151,8 +207,8 @@ class TestGraphEndpoints:
         assert copy_response.json()["data"]["sourceGraphId"] == source_id
 
         # Verify course was copied
-        courses_response = await client.get(f"/api/v1/graphs/{copied_id}/courses")
-        assert len(courses_response.json()["data"]) == 1
+        count_response = await client.get(f"/api/v1/graphs/{copied_id}/courses/count")
+        assert count_response.json()["data"]["total"] == 1
 
 
 class TestCourseEndpoints:
@@ -199,44 +255,40 @@ class TestCourseEndpoints:
         )
         graph_id = graph_response.json()["data"]["id"]
 
-        # Create three courses
-        for i, name in enumerate(["First", "Second", "Third"], start=1):
-            response = await client.post(
+        # Build the three course requests up front, then send them in order
+        requests = [
+            client.build_request(
+                "POST",
                 f"/api/v1/graphs/{graph_id}/courses",
                 json={"name": name, "color": f"#00000{i}"},
             )
+            for i, name in enumerate(["First", "Second", "Third"], start=1)
+        ]
+        for i, request in enumerate(requests, start=1):
+            response = await client.send(request)
             assert response.json()["data"]["courseId"] == i
 
-    async def test_create_course_missing_name(self, client: AsyncClient):
-        """Test creating course without name fails."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Test Graph"}
-        )
-        graph_id = graph_response.json()["data"]["id"]
-
-        response = await client.post(
-            f"/api/v1/graphs/{graph_id}/courses",
-            json={"name": "", "color": "#000000"},
-        )
-        assert response.status_code == 400
-
-    async def test_create_course_missing_color(self, client: AsyncClient):
-        """Test creating course without color fails."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Test Graph"}
-        )
-        graph_id = graph_response.json()["data"]["id"]
-
-        response = await client.post(
-            f"/api/v1/graphs/{graph_id}/courses", json={"name": "Test", "color": ""}
-        )
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"name": "", "color": "#000000"},
+            {"name": "Test", "color": ""},
+        ],
+        ids=["missing-name", "missing-color"],
+    )
+    async def test_create_course_invalid(
+        self, client: AsyncClient, seeded_graph: tuple[str, int], payload: dict
+    ):
+        """Test creating course without a name or color fails."""
+        graph_id, _ = seeded_graph
+
+        response = await client.post(f"/api/v1/graphs/{graph_id}/courses", json=payload)
         assert response.status_code == 400
+        assert response.json()["detail"]["code"] == "VALIDATION_ERROR"
 
     async def test_get_course(self, client: AsyncClient):
         """Test getting a specific course."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Test Graph"}
-        )
+        graph_response = await client.post("/api/v1/graphs", json=TEST_GRAPH)
         graph_id = graph_response.json()["data"]["id"]
 
         await client.post(
@@ -251,20 +303,16 @@ class TestCourseEndpoints:
 
     async def test_get_course_not_found(self, client: AsyncClient):
         """Test getting non-existent course returns 404."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Test Graph"}
-        )
+        graph_response = await client.post("/api/v1/graphs", json=TEST_GRAPH)
         graph_id = graph_response.json()["data"]["id"]
 
         response = await client.get(f"/api/v1/graphs/{graph_id}/courses/999")
         assert response.status_code == 404
-        assert "COURSE_NOT_FOUND" in str(response.json())
+        assert response.json()["detail"]["code"] == "COURSE_NOT_FOUND"
 
     async def test_update_course(self, client: AsyncClient):
         """Test updating a course."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Test Graph"}
-        )
+        graph_response = await client.post("/api/v1/graphs", json=TEST_GRAPH)
         graph_id = graph_response.json()["data"]["id"]
 
         await client.post(
@@ -281,11 +329,11 @@ class TestCourseEndpoints:
         assert data["data"]["name"] == "Updated"
         assert data["data"]["color"] == "#FFFFFF"
 
-    async def test_delete_course(self, client: AsyncClient):
+    async def test_delete_course(
+        self, client: AsyncClient, db: SQLiteAdapter
+    ):
         """Test deleting a course."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Test Graph"}
-        )
+        graph_response = await client.post("/api/v1/graphs", json=TEST_GRAPH)
         graph_id = graph_response.json()["data"]["id"]
 
         await client.post(
@@ -298,39 +346,27 @@ class TestCourseEndpoints:
         assert response.json()["data"]["deleted"] is True
 
         # Verify deletion
-        get_response = await client.get(f"/api/v1/graphs/{graph_id}/courses/1")
-        assert get_response.status_code == 404
+        assert await db.get_course(graph_id, 1) is None
 
 
 class TestTopicEndpoints:
     """Tests for /api/v1/graphs/{graphId}/topics endpoints."""
 
-    async def _create_graph_with_course(self, client: AsyncClient) -> tuple[str, int]:
-        """Helper to create a graph with a course."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Topic Test Graph"}
-        )
-        graph_id = graph_response.json()["data"]["id"]
-
-        course_response = await client.post(
-            f"/api/v1/graphs/{graph_id}/courses",
-            json={"name": "Test Course", "color": "#000000"},
-        )
-        course_id = course_response.json()["data"]["courseId"]
-
-        return graph_id, course_id
-
-    async def test_list_topics_empty(self, client: AsyncClient):
+    async def test_list_topics_empty(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
         """Test listing topics when none exist."""
-        graph_id, _ = await self._create_graph_with_course(client)
+        graph_id, _ = seeded_graph
 
         response = await client.get(f"/api/v1/graphs/{graph_id}/topics")
         assert response.status_code == 200
         assert response.json()["data"] == []
 
-    async def test_create_topic(self, client: AsyncClient):
+    async def test_create_topic(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
         """Test creating a topic."""
-        graph_id, course_id = await self._create_graph_with_course(client)
+        graph_id, course_id = seeded_graph
 
         response = await client.post(
             f"/api/v1/graphs/{graph_id}/topics",
@@ -351,9 +387,11 @@ class TestTopicEndpoints:
         assert data["data"]["parentSlugs"] == []
         assert data["data"]["hasContent"] is True
 
-    async def test_create_topic_without_content(self, client: AsyncClient):
+    async def test_create_topic_without_content(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
         """Test creating a topic without content."""
-        graph_id, course_id = await self._create_graph_with_course(client)
+        graph_id, course_id = seeded_graph
 
         response = await client.post(
             f"/api/v1/graphs/{graph_id}/topics",
@@ -366,9 +404,11 @@ class TestTopicEndpoints:
         assert response.status_code == 201
         assert response.json()["data"]["hasContent"] is False
 
-    async def test_create_topic_duplicate_slug_fails(self, client: AsyncClient):
+    async def test_create_topic_duplicate_slug_fails(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
         """Test creating topic with duplicate slug fails."""
-        graph_id, course_id = await self._create_graph_with_course(client)
+        graph_id, course_id = seeded_graph
 
         await client.post(
             f"/api/v1/graphs/{graph_id}/topics",
@@ -388,26 +428,49 @@ class TestTopicEndpoints:
             },
         )
         assert response.status_code == 409
-        assert "DUPLICATE_ENTRY" in str(response.json())
-
-    async def test_create_topic_invalid_course_fails(self, client: AsyncClient):
-        """Test creating topic with non-existent course fails."""
-        graph_id, _ = await self._create_graph_with_course(client)
-
-        response = await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={
-                "urlSlug": "test",
-                "displayName": "Test",
-                "courseId": 999,
-            },
-        )
-        assert response.status_code == 404
-        assert "COURSE_NOT_FOUND" in str(response.json())
-
-    async def test_get_topic(self, client: AsyncClient):
+        assert response.json()["detail"]["code"] == "DUPLICATE_ENTRY"
+
+    @pytest.mark.parametrize(
+        "payload,status_code,code",
+        [
+            (
+                {"urlSlug": "test", "displayName": "Test", "courseId": 999},
+                404,
+                "COURSE_NOT_FOUND",
+            ),
+            (
+                {"urlSlug": "", "displayName": "Test", "courseId": 1},
+                400,
+                "VALIDATION_ERROR",
+            ),
+            (
+                {"urlSlug": "test", "displayName": "", "courseId": 1},
+                400,
+                "VALIDATION_ERROR",
+            ),
+        ],
+        ids=["invalid-course", "missing-slug", "missing-display-name"],
+    )
+    async def test_create_topic_invalid(
+        self,
+        client: AsyncClient,
+        seeded_graph: tuple[str, int],
+        payload: dict,
+        status_code: int,
+        code: str,
+    ):
+        """Test creating topic with invalid data fails."""
+        graph_id, _ = seeded_graph
+
+        response = await client.post(f"/api/v1/graphs/{graph_id}/topics", json=payload)
+        assert response.status_code == status_code
+        assert response.json()["detail"]["code"] == code
+
+    async def test_get_topic(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
         """Test getting a specific topic."""
-        graph_id, course_id = await self._create_graph_with_course(client)
+        graph_id, course_id = seeded_graph
 
         await client.post(
             f"/api/v1/graphs/{graph_id}/topics",
@@ -422,17 +485,21 @@ class TestTopicEndpoints:
         assert response.status_code == 200
         assert response.json()["data"]["urlSlug"] == "get-test"
 
-    async def test_get_topic_not_found(self, client: AsyncClient):
+    async def test_get_topic_not_found(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
         """Test getting non-existent topic returns 404."""
-        graph_id, _ = await self._create_graph_with_course(client)
+        graph_id, _ = seeded_graph
 
         response = await client.get(f"/api/v1/graphs/{graph_id}/topics/nonexistent")
         assert response.status_code == 404
-        assert "TOPIC_NOT_FOUND" in str(response.json())
+        assert response.json()["detail"]["code"] == "TOPIC_NOT_FOUND"
 
-    async def test_update_topic(self, client: AsyncClient):
+    async def test_update_topic(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
         """Test updating a topic."""
-        graph_id, course_id = await self._create_graph_with_course(client)
+        graph_id, course_id = seeded_graph
 
         await client.post(
             f"/api/v1/graphs/{graph_id}/topics",
@@ -452,53 +519,94 @@ class TestTopicEndpoints:
         assert data["data"]["displayName"] == "Updated"
         assert data["data"]["hasContent"] is True
 
-    async def test_delete_topic(self, client: AsyncClient):
-        """Test deleting a topic."""
-        graph_id, course_id = await self._create_graph_with_course(client)
+    async def test_get_topic_after_list_sees_updates(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
+        """Test that topics cached by a listing are not served once stale."""
+        graph_id, course_id = seeded_graph
 
         await client.post(
             f"/api/v1/graphs/{graph_id}/topics",
             json={
-                "urlSlug": "to-delete",
-                "displayName": "To Delete",
+                "urlSlug": "cached",
+                "displayName": "Original",
                 "courseId": course_id,
             },
         )
 
-        response = await client.delete(f"/api/v1/graphs/{graph_id}/topics/to-delete")
-        assert response.status_code == 200
-        assert response.json()["data"]["deleted"] is True
+        # Listing populates the snapshot used by single-topic lookups
+        await client.get(f"/api/v1/graphs/{graph_id}/topics")
+        response = await client.get(f"/api/v1/graphs/{graph_id}/topics/cached")
+        assert response.json()["data"]["displayName"] == "Original"
+        response = await client.get(f"/api/v1/graphs/{graph_id}/topics/missing")
+        assert response.status_code == 404
 
-        # Verify deletion
-        get_response = await client.get(f"/api/v1/graphs/{graph_id}/topics/to-delete")
-        assert get_response.status_code == 404
+        await client.patch(
+            f"/api/v1/graphs/{graph_id}/topics/cached",
+            json={"displayName": "Updated"},
+        )
+        response = await client.get(f"/api/v1/graphs/{graph_id}/topics/cached")
+        assert response.json()["data"]["displayName"] == "Updated"
 
-    async def test_get_topic_prerequisites(self, client: AsyncClient):
-        """Test getting topic prerequisites."""
-        graph_id, course_id = await self._create_graph_with_course(client)
+    async def test_delete_topic(
+        self,
+        client: AsyncClient,
+        db: SQLiteAdapter,
+        seeded_graph: tuple[str, int],
+    ):
+        """Test deleting a topic."""
+        graph_id, course_id = seeded_graph
 
-        # Create two topics
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={
-                "urlSlug": "prerequisite",
-                "displayName": "Prerequisite Topic",
-                "courseId": course_id,
-            },
-        )
         await client.post(
             f"/api/v1/graphs/{graph_id}/topics",
             json={
-                "urlSlug": "dependent",
-                "displayName": "Dependent Topic",
+                "urlSlug": "to-delete",
+                "displayName": "To Delete",
                 "courseId": course_id,
             },
         )
 
-        # Create edge
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/edges",
-            json={"parentSlug": "prerequisite", "childSlug": "dependent"},
+        response = await client.delete(f"/api/v1/graphs/{graph_id}/topics/to-delete")
+        assert response.status_code == 200
+        assert response.json()["data"]["deleted"] is True
+
+        # Verify deletion
+        assert await db.get_topic(graph_id, "to-delete") is None
+
+    async def test_get_topic_prerequisites(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
+        """Test getting topic prerequisites."""
+        graph_id, course_id = seeded_graph
+
+        # Create two topics, then the edge between them
+        await pipeline(
+            [
+                [
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/topics",
+                        json={
+                            "urlSlug": "prerequisite",
+                            "displayName": "Prerequisite Topic",
+                            "courseId": course_id,
+                        },
+                    ),
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/topics",
+                        json={
+                            "urlSlug": "dependent",
+                            "displayName": "Dependent Topic",
+                            "courseId": course_id,
+                        },
+                    ),
+                ],
+                [
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/edges",
+                        json={"parentSlug": "prerequisite", "childSlug": "dependent"},
+                    )
+                ],
+            ]
         )
 
         # Get prerequisites
@@ -510,32 +618,40 @@ class TestTopicEndpoints:
         assert len(prereqs) == 1
         assert prereqs[0]["urlSlug"] == "prerequisite"
 
-    async def test_get_topic_dependents(self, client: AsyncClient):
+    async def test_get_topic_dependents(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
         """Test getting topics that depend on a topic."""
-        graph_id, course_id = await self._create_graph_with_course(client)
-
-        # Create two topics
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={
-                "urlSlug": "parent-topic",
-                "displayName": "Parent Topic",
-                "courseId": course_id,
-            },
-        )
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={
-                "urlSlug": "child-topic",
-                "displayName": "Child Topic",
-                "courseId": course_id,
-            },
-        )
-
-        # Create edge
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/edges",
-            json={"parentSlug": "parent-topic", "childSlug": "child-topic"},
+        graph_id, course_id = seeded_graph
+
+        # Create two topics, then the edge between them
+        await pipeline(
+            [
+                [
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/topics",
+                        json={
+                            "urlSlug": "parent-topic",
+                            "displayName": "Parent Topic",
+                            "courseId": course_id,
+                        },
+                    ),
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/topics",
+                        json={
+                            "urlSlug": "child-topic",
+                            "displayName": "Child Topic",
+                            "courseId": course_id,
+                        },
+                    ),
+                ],
+                [
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/edges",
+                        json={"parentSlug": "parent-topic", "childSlug": "child-topic"},
+                    )
+                ],
+            ]
         )
 
         # Get dependents
@@ -547,6 +663,105 @@ class TestTopicEndpoints:
         assert len(dependents) == 1
         assert dependents[0]["urlSlug"] == "child-topic"
 
+    async def test_get_topic_prerequisites_max_depth(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
+        """Test walking prerequisites and dependents transitively."""
+        graph_id, course_id = seeded_graph
+
+        # Create a chain: first -> second -> third
+        await pipeline(
+            [
+                [
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/topics",
+                        json={
+                            "urlSlug": slug,
+                            "displayName": slug.title(),
+                            "courseId": course_id,
+                        },
+                    )
+                    for slug in ["first", "second", "third"]
+                ],
+                [
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/edges",
+                        json={"parentSlug": parent, "childSlug": child},
+                    )
+                    for parent, child in [("first", "second"), ("second", "third")]
+                ],
+            ]
+        )
+
+        # Default depth only returns direct prerequisites
+        response = await client.get(
+            f"/api/v1/graphs/{graph_id}/topics/third/prerequisites"
+        )
+        assert [t["urlSlug"] for t in response.json()["data"]] == ["second"]
+
+        # Nearest topics come first
+        response = await client.get(
+            f"/api/v1/graphs/{graph_id}/topics/third/prerequisites?maxDepth=5"
+        )
+        assert [t["urlSlug"] for t in response.json()["data"]] == ["second", "first"]
+
+        response = await client.get(
+            f"/api/v1/graphs/{graph_id}/topics/first/dependents?maxDepth=2"
+        )
+        assert [t["urlSlug"] for t in response.json()["data"]] == ["second", "third"]
+
+    async def test_get_topic_prerequisites_cyclic_graph(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
+        """Test that cycles are walked once per topic and maxDepth is capped."""
+        graph_id, course_id = seeded_graph
+
+        # Create a cycle: first -> second -> third -> first
+        await pipeline(
+            [
+                [
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/topics",
+                        json={
+                            "urlSlug": slug,
+                            "displayName": slug.title(),
+                            "courseId": course_id,
+                        },
+                    )
+                    for slug in ["first", "second", "third"]
+                ],
+                [
+                    client.post(
+                        f"/api/v1/graphs/{graph_id}/edges",
+                        json={"parentSlug": parent, "childSlug": child},
+                    )
+                    for parent, child in [
+                        ("first", "second"),
+                        ("second", "third"),
+                        ("third", "first"),
+                    ]
+                ],
+            ]
+        )
+
+        response = await client.get(
+            f"/api/v1/graphs/{graph_id}/topics/third/prerequisites?maxDepth=50"
+        )
+        assert response.status_code == 200
+        assert [t["urlSlug"] for t in response.json()["data"]] == ["second", "first"]
+
+        response = await client.get(
+            f"/api/v1/graphs/{graph_id}/topics/third/dependents?maxDepth=50"
+        )
+        assert response.status_code == 200
+        assert [t["urlSlug"] for t in response.json()["data"]] == ["first", "second"]
+
+        for relation in ["prerequisites", "dependents"]:
+            response = await client.get(
+                f"/api/v1/graphs/{graph_id}/topics/third/{relation}?maxDepth=51"
+            )
+            assert response.status_code == 422
+
 
 class TestEdgeEndpoints:
     """Tests for /api/v1/graphs/{graphId}/edges endpoints."""
@@ -560,18 +775,18 @@ class TestEdgeEndpoints:
         )
         graph_id = graph_response.json()["data"]["id"]
 
+        # Batch creates run courses before topics, so one call sets up both
         await client.post(
-            f"/api/v1/graphs/{graph_id}/courses",
-            json={"name": "Test Course", "color": "#000000"},
-        )
-
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={"urlSlug": "topic-a", "displayName": "Topic A", "courseId": 1},
-        )
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={"urlSlug": "topic-b", "displayName": "Topic B", "courseId": 1},
+            f"/api/v1/graphs/{graph_id}/batch",
+            json={
+                "courses": {"create": [TEST_COURSE]},
+                "topics": {
+                    "create": [
+                        {"urlSlug": "topic-a", "displayName": "Topic A", "courseId": 1},
+                        {"urlSlug": "topic-b", "displayName": "Topic B", "courseId": 1},
+                    ]
+                },
+            },
         )
 
         return graph_id, "topic-a", "topic-b"
@@ -584,6 +799,26 @@ class TestEdgeEndpoints:
         assert response.status_code == 200
         assert response.json()["data"] == []
 
+    async def test_list_edges_etag(self, client: AsyncClient):
+        """Test that the edge listing is answered with 304 until an edge changes."""
+        graph_id, topic_a, topic_b = await self._create_graph_with_topics(client)
+        url = f"/api/v1/graphs/{graph_id}/edges"
+
+        response = await client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        cached = await client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        # Creating an edge invalidates the ETag
+        await client.post(url, json={"parentSlug": topic_a, "childSlug": topic_b})
+        response = await client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert len(response.json()["data"]) == 1
+
     async def test_create_edge(self, client: AsyncClient):
         """Test creating an edge."""
         graph_id, topic_a, topic_b = await self._create_graph_with_topics(client)
@@ -598,7 +833,9 @@ class TestEdgeEndpoints:
         assert data["data"]["parentSlug"] == topic_a
         assert data["data"]["childSlug"] == topic_b
 
-    async def test_create_edge_updates_parent_slugs(self, client: AsyncClient):
+    async def test_create_edge_updates_parent_slugs(
+        self, client: AsyncClient, db: SQLiteAdapter
+    ):
         """Test that creating an edge updates the child's parentSlugs."""
         graph_id, topic_a, topic_b = await self._create_graph_with_topics(client)
 
@@ -608,19 +845,49 @@ class TestEdgeEndpoints:
         )
 
         # Check child topic's parentSlugs
-        topic_response = await client.get(f"/api/v1/graphs/{graph_id}/topics/{topic_b}")
-        assert topic_a in topic_response.json()["data"]["parentSlugs"]
-
-    async def test_create_self_reference_edge_fails(self, client: AsyncClient):
-        """Test creating self-referencing edge fails."""
-        graph_id, topic_a, _ = await self._create_graph_with_topics(client)
+        child = await db.get_topic(graph_id, topic_b)
+        assert topic_a in child.parent_slugs
+
+    @pytest.mark.parametrize(
+        "payload,status_code,code,message",
+        [
+            (
+                {"parentSlug": "topic-a", "childSlug": "topic-a"},
+                400,
+                "VALIDATION_ERROR",
+                "self-referencing",
+            ),
+            (
+                {"parentSlug": "nonexistent", "childSlug": "topic-b"},
+                404,
+                "TOPIC_NOT_FOUND",
+                "parent topic nonexistent",
+            ),
+            (
+                {"parentSlug": "topic-a", "childSlug": "nonexistent"},
+                404,
+                "TOPIC_NOT_FOUND",
+                "child topic nonexistent",
+            ),
+        ],
+        ids=["self-reference", "nonexistent-parent", "nonexistent-child"],
+    )
+    async def test_create_edge_invalid(
+        self,
+        client: AsyncClient,
+        payload: dict,
+        status_code: int,
+        code: str,
+        message: str,
+    ):
+        """Test creating a self-referencing or dangling edge fails."""
+        graph_id, _, _ = await self._create_graph_with_topics(client)
 
-        response = await client.post(
-            f"/api/v1/graphs/{graph_id}/edges",
-            json={"parentSlug": topic_a, "childSlug": topic_a},
-        )
-        assert response.status_code == 400
-        assert "self-referencing" in str(response.json()).lower()
+        response = await client.post(f"/api/v1/graphs/{graph_id}/edges", json=payload)
+        assert response.status_code == status_code
+        detail = response.json()["detail"]
+        assert detail["code"] == code
+        assert message in detail["message"].lower()
 
     async def test_create_duplicate_edge_fails(self, client: AsyncClient):
         """Test creating duplicate edge fails."""
@@ -636,18 +903,7 @@ class TestEdgeEndpoints:
             json={"parentSlug": topic_a, "childSlug": topic_b},
         )
         assert response.status_code == 409
-        assert "DUPLICATE_ENTRY" in str(response.json())
-
-    async def test_create_edge_nonexistent_parent_fails(self, client: AsyncClient):
-        """Test creating edge with non-existent parent fails."""
-        graph_id, _, topic_b = await self._create_graph_with_topics(client)
-
-        response = await client.post(
-            f"/api/v1/graphs/{graph_id}/edges",
-            json={"parentSlug": "nonexistent", "childSlug": topic_b},
-        )
-        assert response.status_code == 404
-        assert "TOPIC_NOT_FOUND" in str(response.json())
+        assert response.json()["detail"]["code"] == "DUPLICATE_ENTRY"
 
     async def test_delete_edge(self, client: AsyncClient):
         """Test deleting an edge."""
@@ -664,7 +920,9 @@ class TestEdgeEndpoints:
         assert response.status_code == 200
         assert response.json()["data"]["deleted"] is True
 
-    async def test_delete_edge_updates_parent_slugs(self, client: AsyncClient):
+    async def test_delete_edge_updates_parent_slugs(
+        self, client: AsyncClient, db: SQLiteAdapter
+    ):
         """Test that deleting an edge updates the child's parentSlugs."""
         graph_id, topic_a, topic_b = await self._create_graph_with_topics(client)
 
@@ -676,8 +934,8 @@ class TestEdgeEndpoints:
         await client.delete(f"/api/v1/graphs/{graph_id}/edges/{topic_a}/{topic_b}")
 
         # Check child topic's parentSlugs
-        topic_response = await client.get(f"/api/v1/graphs/{graph_id}/topics/{topic_b}")
-        assert topic_a not in topic_response.json()["data"]["parentSlugs"]
+        child = await db.get_topic(graph_id, topic_b)
+        assert topic_a not in child.parent_slugs
 
     async def test_delete_edge_not_found(self, client: AsyncClient):
         """Test deleting non-existent edge returns 404."""
@@ -687,171 +945,342 @@ class TestEdgeEndpoints:
             f"/api/v1/graphs/{graph_id}/edges/{topic_a}/{topic_b}"
         )
         assert response.status_code == 404
-        assert "EDGE_NOT_FOUND" in str(response.json())
+        assert response.json()["detail"]["code"] == "EDGE_NOT_FOUND"
 
 
 class TestBatchOperations:
     """Tests for /api/v1/graphs/{graphId}/batch endpoint."""
 
-    async def test_batch_create_courses(self, client: AsyncClient):
-        """Test batch creating courses."""
+    async def test_batch_mixed_operations(
+        self, client: AsyncClient, db: SQLiteAdapter
+    ):
+        """Test one batch that creates, updates and deletes across all types."""
         graph_response = await client.post(
             "/api/v1/graphs", json={"name": "Batch Test Graph"}
         )
         graph_id = graph_response.json()["data"]["id"]
 
-        response = await client.post(
+        # Setup: create course, topics, edge
+        await client.post(
             f"/api/v1/graphs/{graph_id}/batch",
             json={
                 "courses": {
                     "create": [
-                        {"name": "Course 1", "color": "#111111"},
-                        {"name": "Course 2", "color": "#222222"},
+                        {"name": "Original", "color": "#000000"},
+                        {"name": "Doomed", "color": "#000000"},
                     ]
-                }
+                },
+                "topics": {
+                    "create": [
+                        {"urlSlug": "del-a", "displayName": "Del A", "courseId": 1},
+                        {"urlSlug": "del-b", "displayName": "Del B", "courseId": 1},
+                    ]
+                },
+                "edges": {"create": [{"parentSlug": "del-a", "childSlug": "del-b"}]},
             },
         )
-        assert response.status_code == 200
-        data = response.json()["data"]
-        assert data["coursesCreated"] == 2
-
-    async def test_batch_create_topics_and_edges(self, client: AsyncClient):
-        """Test batch creating topics and edges."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Batch Test Graph"}
-        )
-        graph_id = graph_response.json()["data"]["id"]
-
-        # Create course first
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/courses",
-            json={"name": "Test", "color": "#000000"},
-        )
 
         response = await client.post(
             f"/api/v1/graphs/{graph_id}/batch",
             json={
+                "courses": {
+                    "create": [
+                        {"name": "Course 1", "color": "#111111"},
+                        {"name": "Course 2", "color": "#222222"},
+                    ],
+                    "update": [{"courseId": 1, "data": {"name": "Updated"}}],
+                    "delete": [2],
+                },
                 "topics": {
                     "create": [
                         {"urlSlug": "batch-a", "displayName": "Batch A", "courseId": 1},
                         {"urlSlug": "batch-b", "displayName": "Batch B", "courseId": 1},
-                    ]
+                    ],
+                    "update": [{"urlSlug": "del-b", "data": {"displayName": "Kept B"}}],
+                    "delete": ["del-a"],
                 },
                 "edges": {
-                    "create": [{"parentSlug": "batch-a", "childSlug": "batch-b"}]
+                    "create": [{"parentSlug": "batch-a", "childSlug": "batch-b"}],
+                    "delete": [{"parentSlug": "del-a", "childSlug": "del-b"}],
                 },
             },
         )
         assert response.status_code == 200
-        data = response.json()["data"]
+        data = orjson.loads(response.content)["data"]
+        assert data["coursesCreated"] == 2
+        assert data["coursesUpdated"] == 1
+        assert data["coursesDeleted"] == 1
         assert data["topicsCreated"] == 2
+        assert data["topicsUpdated"] == 1
+        assert data["topicsDeleted"] == 1
         assert data["edgesCreated"] == 1
+        assert data["edgesDeleted"] == 1
 
-    async def test_batch_update_courses(self, client: AsyncClient):
-        """Test batch updating courses."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Batch Test Graph"}
+        # Verify updates, deletes and the rebuilt parents
+        course = await db.get_course(graph_id, 1)
+        assert course.name == "Updated"
+        # Deletes run first, so the new courses reuse the deleted course's id
+        courses = await db.list_courses(graph_id)
+        assert [c.name for c in courses] == ["Updated", "Course 1", "Course 2"]
+
+        batch_b = await db.get_topic(graph_id, "batch-b")
+        assert batch_b.parent_slugs == ["batch-a"]
+        del_b = await db.get_topic(graph_id, "del-b")
+        assert del_b.display_name == "Kept B"
+        assert del_b.parent_slugs == []
+
+    async def test_batch_rebuilds_parent_slugs(
+        self,
+        client: AsyncClient,
+        db: SQLiteAdapter,
+        seeded_graph: tuple[str, int],
+    ):
+        """Test that edge and topic changes rebuild the children's parentSlugs."""
+        graph_id, course_id = seeded_graph
+        url = f"/api/v1/graphs/{graph_id}/batch"
+
+        await client.post(
+            url,
+            json={
+                "topics": {
+                    "create": [
+                        {"urlSlug": slug, "displayName": slug, "courseId": course_id}
+                        for slug in ["topic-a", "topic-b", "topic-c"]
+                    ]
+                },
+                "edges": {
+                    "create": [
+                        {"parentSlug": "topic-a", "childSlug": "topic-c"},
+                        {"parentSlug": "topic-b", "childSlug": "topic-c"},
+                    ]
+                },
+            },
         )
-        graph_id = graph_response.json()["data"]["id"]
+        child = await db.get_topic(graph_id, "topic-c")
+        assert child.parent_slugs == ["topic-a", "topic-b"]
 
         await client.post(
-            f"/api/v1/graphs/{graph_id}/courses",
-            json={"name": "Original", "color": "#000000"},
+            url,
+            json={"edges": {"delete": [{"parentSlug": "topic-a", "childSlug": "topic-c"}]}},
+        )
+        child = await db.get_topic(graph_id, "topic-c")
+        assert child.parent_slugs == ["topic-b"]
+
+        await client.post(url, json={"topics": {"delete": ["topic-b"]}})
+        child = await db.get_topic(graph_id, "topic-c")
+        assert child.parent_slugs == []
+
+    async def test_batch_recreated_topic_keeps_new_parents(
+        self,
+        client: AsyncClient,
+        db: SQLiteAdapter,
+        seeded_graph: tuple[str, int],
+    ):
+        """Test that a topic deleted and recreated in one batch gets its new parents."""
+        graph_id, course_id = seeded_graph
+        url = f"/api/v1/graphs/{graph_id}/batch"
+
+        await client.post(
+            url,
+            json={
+                "topics": {
+                    "create": [
+                        {"urlSlug": slug, "displayName": slug, "courseId": course_id}
+                        for slug in ["a", "x"]
+                    ]
+                }
+            },
         )
 
         response = await client.post(
-            f"/api/v1/graphs/{graph_id}/batch",
+            url,
             json={
-                "courses": {
-                    "update": [{"courseId": 1, "data": {"name": "Updated"}}]
-                }
+                "topics": {
+                    "create": [{"urlSlug": "x", "displayName": "x", "courseId": course_id}],
+                    "delete": ["x"],
+                },
+                "edges": {"create": [{"parentSlug": "a", "childSlug": "x"}]},
             },
         )
         assert response.status_code == 200
-        assert response.json()["data"]["coursesUpdated"] == 1
 
-        # Verify update
-        course_response = await client.get(f"/api/v1/graphs/{graph_id}/courses/1")
-        assert course_response.json()["data"]["name"] == "Updated"
+        child = await db.get_topic(graph_id, "x")
+        assert child.parent_slugs == ["a"]
 
-    async def test_batch_delete_operations(self, client: AsyncClient):
-        """Test batch delete operations."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Batch Test Graph"}
-        )
-        graph_id = graph_response.json()["data"]["id"]
+    async def test_batch_topic_update_recomputes_has_content(
+        self,
+        client: AsyncClient,
+        db: SQLiteAdapter,
+        seeded_graph: tuple[str, int],
+    ):
+        """Test that batch topic updates keep hasContent in step with the content."""
+        graph_id, course_id = seeded_graph
+        url = f"/api/v1/graphs/{graph_id}/batch"
 
-        # Setup: create course, topics, edge
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/courses",
-            json={"name": "To Delete", "color": "#000000"},
-        )
         await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={"urlSlug": "del-a", "displayName": "Del A", "courseId": 1},
-        )
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={"urlSlug": "del-b", "displayName": "Del B", "courseId": 1},
+            url,
+            json={
+                "topics": {
+                    "create": [
+                        {"urlSlug": "topic", "displayName": "Topic", "courseId": course_id}
+                    ]
+                }
+            },
         )
+        assert (await db.get_topic(graph_id, "topic")).has_content is False
+
+        # Each update is applied on top of the previous one
+        for data, has_content in [
+            ({"contentHtml": "<p>Content</p>"}, True),
+            ({"displayName": "Renamed"}, True),
+            ({"contentHtml": ""}, False),
+            ({"contentText": "Plain text"}, True),
+        ]:
+            response = await client.post(
+                url,
+                json={"topics": {"update": [{"urlSlug": "topic", "data": data}]}},
+            )
+            assert response.json()["data"]["topicsUpdated"] == 1
+            assert (await db.get_topic(graph_id, "topic")).has_content is has_content
+
+    async def test_batch_counts_only_touched_rows(
+        self, client: AsyncClient, seeded_graph: tuple[str, int]
+    ):
+        """Test that duplicates, self-references and missing rows aren't counted."""
+        graph_id, course_id = seeded_graph
+        url = f"/api/v1/graphs/{graph_id}/batch"
+
         await client.post(
-            f"/api/v1/graphs/{graph_id}/edges",
-            json={"parentSlug": "del-a", "childSlug": "del-b"},
+            url,
+            json={
+                "topics": {
+                    "create": [
+                        {"urlSlug": "topic-a", "displayName": "A", "courseId": course_id},
+                        {"urlSlug": "topic-b", "displayName": "B", "courseId": course_id},
+                    ]
+                },
+                "edges": {"create": [{"parentSlug": "topic-a", "childSlug": "topic-b"}]},
+            },
         )
 
         response = await client.post(
-            f"/api/v1/graphs/{graph_id}/batch",
+            url,
             json={
-                "edges": {"delete": [{"parentSlug": "del-a", "childSlug": "del-b"}]},
-                "topics": {"delete": ["del-a"]},
+                "courses": {
+                    "update": [{"courseId": 999, "data": {"name": "Missing"}}],
+                    "delete": [999],
+                },
+                "topics": {
+                    "create": [
+                        {"urlSlug": "topic-a", "displayName": "A", "courseId": course_id},
+                        {"urlSlug": "topic-c", "displayName": "C", "courseId": course_id},
+                    ],
+                    "update": [{"urlSlug": "missing", "data": {"displayName": "X"}}],
+                    "delete": ["missing"],
+                },
+                "edges": {
+                    "create": [
+                        {"parentSlug": "topic-a", "childSlug": "topic-b"},
+                        {"parentSlug": "topic-c", "childSlug": "topic-c"},
+                        {"parentSlug": "topic-a", "childSlug": "topic-c"},
+                    ],
+                    "delete": [{"parentSlug": "topic-b", "childSlug": "topic-a"}],
+                },
             },
         )
         assert response.status_code == 200
-        data = response.json()["data"]
-        assert data["edgesDeleted"] == 1
-        assert data["topicsDeleted"] == 1
+        assert response.json()["data"] == {
+            "coursesCreated": 0,
+            "coursesUpdated": 0,
+            "coursesDeleted": 0,
+            "topicsCreated": 1,
+            "topicsUpdated": 0,
+            "topicsDeleted": 0,
+            "edgesCreated": 1,
+            "edgesDeleted": 0,
+        }
+
+    async def test_batch_rolls_back_on_error(
+        self,
+        db: SQLiteAdapter,
+        seeded_graph: tuple[str, int],
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that a failing batch leaves the graph untouched."""
+        graph_id, course_id = seeded_graph
+
+        # The etag bump is the last statement inside the batch transaction
+        async def fail(graph_id: str) -> None:
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(db, "_bump_etag_version", fail)
+        operations = BatchOperations.model_validate(
+            {
+                "courses": {"delete": [course_id]},
+                "topics": {
+                    "create": [
+                        {"urlSlug": "topic", "displayName": "Topic", "courseId": course_id}
+                    ]
+                },
+            }
+        )
+        with pytest.raises(RuntimeError):
+            await db.batch_update(graph_id, operations)
+        monkeypatch.undo()
+
+        assert not db.db.in_transaction
+        assert await db.get_course(graph_id, course_id) is not None
+        assert await db.get_topic(graph_id, "topic") is None
+
+    async def test_concurrent_batches_on_different_graphs(
+        self, client: AsyncClient, db: SQLiteAdapter
+    ):
+        """Test that batches running at the same time don't interfere."""
+        graph_ids = [
+            (await client.post("/api/v1/graphs", json={"name": name})).json()["data"]["id"]
+            for name in ["Batch Graph 1", "Batch Graph 2"]
+        ]
+
+        def payload(i: int) -> dict:
+            return {
+                "courses": {"create": [{"name": f"Course {i}", "color": "#000000"}]},
+                "topics": {
+                    "create": [
+                        {"urlSlug": f"t{i}-a", "displayName": f"T{i} A", "courseId": 1},
+                        {"urlSlug": f"t{i}-b", "displayName": f"T{i} B", "courseId": 1},
+                    ]
+                },
+                "edges": {"create": [{"parentSlug": f"t{i}-a", "childSlug": f"t{i}-b"}]},
+            }
+
+        responses = await asyncio.gather(
+            *(
+                client.post(f"/api/v1/graphs/{graph_id}/batch", json=payload(i))
+                for graph_id in graph_ids
+                for i in range(3)
+            )
+        )
+        assert [r.status_code for r in responses] == [200] * 6
+
+        for graph_id in graph_ids:
+            data = await db.get_full_graph_data(graph_id)
+            assert len(data.courses) == 3
+            assert len(data.topics) == 6
+            assert len(data.edges) == 3
 
 
 class TestFullGraphData:
     """Tests for /api/v1/graphs/{graphId}/data endpoint."""
 
-    async def test_get_full_graph_data(self, client: AsyncClient):
+    async def test_get_full_graph_data(
+        self, client: AsyncClient, seeded_graph_id: str
+    ):
         """Test getting full graph data."""
-        graph_response = await client.post(
-            "/api/v1/graphs", json={"name": "Full Data Test"}
-        )
-        graph_id = graph_response.json()["data"]["id"]
-
-        # Create course
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/courses",
-            json={"name": "Test Course", "color": "#FF0000"},
-        )
-
-        # Create topics
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={
-                "urlSlug": "topic-1",
-                "displayName": "Topic 1",
-                "courseId": 1,
-                "contentHtml": "<p>Content</p>",
-            },
-        )
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/topics",
-            json={"urlSlug": "topic-2", "displayName": "Topic 2", "courseId": 1},
-        )
-
-        # Create edge
-        await client.post(
-            f"/api/v1/graphs/{graph_id}/edges",
-            json={"parentSlug": "topic-1", "childSlug": "topic-2"},
-        )
+        graph_id = seeded_graph_id
 
         response = await client.get(f"/api/v1/graphs/{graph_id}/data")
         assert response.status_code == 200
-        data = response.json()["data"]
+        data = orjson.loads(response.content)["data"]
 
         # Verify structure
         assert "graph" in data
@@ -865,71 +1294,184 @@ class TestFullGraphData:
 
         # Verify courses (without graphId)
         assert len(data["courses"]) == 1
-        assert "graphId" not in data["courses"][0]
         assert data["courses"][0]["name"] == "Test Course"
+        assert all("graphId" not in c for c in data["courses"])
 
         # Verify topics (without graphId, contentHtml stripped)
         assert len(data["topics"]) == 2
-        for topic in data["topics"]:
-            assert "graphId" not in topic
-            assert topic["contentHtml"] is None  # Stripped
+        assert all(
+            "graphId" not in t and t["contentHtml"] is None for t in data["topics"]
+        )
 
         # Verify edges (without graphId)
         assert len(data["edges"]) == 1
-        assert "graphId" not in data["edges"][0]
-
-
-class TestReadonlyConstraints:
-    """Tests for readonly graph constraints."""
-
-    async def test_cannot_create_course_on_readonly(self, client: AsyncClient):
-        """Test that creating a course on readonly graph fails."""
-        list_response = await client.get("/api/v1/graphs")
-        default_graph = next(
-            g for g in list_response.json()["data"] if g["isReadonly"]
+        assert all("graphId" not in e for e in data["edges"])
+
+    async def test_get_full_graph_data_threaded_dump(
+        self,
+        client: AsyncClient,
+        seeded_graph_id: str,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that serializing in a worker thread renders the same body."""
+        url = f"/api/v1/graphs/{seeded_graph_id}/data"
+        inline = await client.get(url)
+
+        monkeypatch.setattr(graphs_routes, "THREADED_DUMP_MIN_ROWS", 0)
+        threaded = await client.get(url)
+
+        assert threaded.status_code == 200
+        assert threaded.content == inline.content
+
+    async def test_get_full_graph_data_etag(self, client: AsyncClient):
+        """Test that unchanged graph data is answered with 304 Not Modified."""
+        graph_response = await client.post(
+            "/api/v1/graphs", json={"name": "ETag Test"}
         )
+        graph_id = graph_response.json()["data"]["id"]
 
-        response = await client.post(
-            f"/api/v1/graphs/{default_graph['id']}/courses",
-            json={"name": "Test", "color": "#000000"},
-        )
-        assert response.status_code == 409
-        assert "READONLY_GRAPH" in str(response.json())
+        response = await client.get(f"/api/v1/graphs/{graph_id}/data")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
 
-    async def test_cannot_create_topic_on_readonly(self, client: AsyncClient):
-        """Test that creating a topic on readonly graph fails."""
-        list_response = await client.get("/api/v1/graphs")
-        default_graph = next(
-            g for g in list_response.json()["data"] if g["isReadonly"]
+        cached = await client.get(
+            f"/api/v1/graphs/{graph_id}/data", headers={"If-None-Match": etag}
         )
+        assert cached.status_code == 304
+        assert cached.content == b""
 
-        response = await client.post(
-            f"/api/v1/graphs/{default_graph['id']}/topics",
-            json={"urlSlug": "test", "displayName": "Test", "courseId": 1},
+        # Any write to the graph invalidates the ETag
+        await client.post(
+            f"/api/v1/graphs/{graph_id}/courses",
+            json={"name": "Test Course", "color": "#FF0000"},
         )
-        assert response.status_code == 409
-        assert "READONLY_GRAPH" in str(response.json())
-
-    async def test_cannot_batch_on_readonly(self, client: AsyncClient):
-        """Test that batch operations on readonly graph fails."""
-        list_response = await client.get("/api/v1/graphs")
-        default_graph = next(
-            g for g in list_response.json()["data"] if g["isReadonly"]
+        response = await client.get(
+            f"/api/v1/graphs/{graph_id}/data", headers={"If-None-Match": etag}
         )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert len(response.json()["data"]["courses"]) == 1
+
+
+    async def test_get_full_graph_data_etag_after_migration(
+        self,
+        client: AsyncClient,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that a database created before etag_version existed serves ETags."""
+        db_path = tmp_path / "legacy.db"
+        with closing(sqlite3.connect(db_path)) as legacy:
+            legacy.execute(
+                """
+                CREATE TABLE knowledge_graphs (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    description TEXT,
+                    is_default INTEGER DEFAULT 0,
+                    is_readonly INTEGER DEFAULT 0,
+                    source_graph_id TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            legacy.execute(
+                "INSERT INTO knowledge_graphs (id, name, created_at, updated_at) "
+                "VALUES ('legacy', 'Legacy Graph', '', '')"
+            )
+            legacy.commit()
+
+        adapter = SQLiteAdapter(db_path=str(db_path))
+        await adapter.initialize()
+        monkeypatch.setattr(app.state, "db", adapter)
+        try:
+            response = await client.get("/api/v1/graphs/legacy/data")
+            assert response.status_code == 200
+            etag = response.headers["etag"]
+
+            cached = await client.get(
+                "/api/v1/graphs/legacy/data", headers={"If-None-Match": etag}
+            )
+            assert cached.status_code == 304
+        finally:
+            await adapter.close()
+
+class TestReadonlyConstraints:
+    """Tests for readonly graph constraints."""
 
+    @pytest.mark.parametrize(
+        "suffix,payload",
+        [
+            ("/courses", TEST_COURSE),
+            ("/topics", {"urlSlug": "test", "displayName": "Test", "courseId": 1}),
+            ("/batch", {"courses": {"create": [{"name": "Test", "color": "#000"}]}}),
+        ],
+        ids=["course", "topic", "batch"],
+    )
+    async def test_cannot_write_to_readonly(
+        self,
+        client: AsyncClient,
+        default_readonly_graph_id: str,
+        suffix: str,
+        payload: dict,
+    ):
+        """Test that creating courses, topics or batches on a readonly graph fails."""
         response = await client.post(
-            f"/api/v1/graphs/{default_graph['id']}/batch",
-            json={"courses": {"create": [{"name": "Test", "color": "#000"}]}},
+            f"/api/v1/graphs/{default_readonly_graph_id}{suffix}", json=payload
         )
         assert response.status_code == 409
-        assert "READONLY_GRAPH" in str(response.json())
+        assert b"READONLY_GRAPH" in response.content
 
 
 class TestHealthEndpoint:
     """Tests for health check endpoint."""
 
+    async def test_health_check_handler(self):
+        """Test the health check handler without going through HTTP."""
+        assert await health_check() == {"status": "healthy"}
+
     async def test_health_check(self, client: AsyncClient):
         """Test health check endpoint."""
         response = await client.get("/health")
         assert response.status_code == 200
         assert response.json()["status"] == "healthy"
+
+
+class TestGraphSnapshotCache:
+    """Tests for the in-process topic snapshot cache."""
+
+    def _graph(self, graph_id: str, etag_version: int = 0) -> KnowledgeGraph:
+        """Helper to build a graph at the given etag version."""
+        return KnowledgeGraph(
+            id=graph_id,
+            name=graph_id,
+            is_default=False,
+            is_readonly=False,
+            etag_version=etag_version,
+            created_at="",
+            updated_at="",
+        )
+
+    def test_stale_snapshot_is_dropped(self):
+        """Test that a version mismatch evicts the snapshot."""
+        snapshots = GraphSnapshotCache()
+        snapshots.store_topics(self._graph("graph"), [])
+
+        assert snapshots.get_topics(self._graph("graph", etag_version=1)) is None
+        # Going back to the old version must not resurrect it
+        assert snapshots.get_topics(self._graph("graph")) is None
+
+    def test_least_recently_used_graph_is_evicted(self):
+        """Test that the cache keeps at most max_graphs snapshots."""
+        snapshots = GraphSnapshotCache(max_graphs=2)
+        snapshots.store_topics(self._graph("first"), [])
+        snapshots.store_topics(self._graph("second"), [])
+
+        # Reading "first" makes "second" the least recently used
+        assert snapshots.get_topics(self._graph("first")) == {}
+        snapshots.store_topics(self._graph("third"), [])
+
+        assert snapshots.get_topics(self._graph("second")) is None
+        assert snapshots.get_topics(self._graph("first")) == {}
+        assert snapshots.get_topics(self._graph("third")) == {}